@@ -0,0 +1,47 @@
+from PyQt6.QtCore import QPropertyAnimation, QEasingCurve, QElapsedTimer, QSize
+
+FRAME_BUDGET_MS = 16
+
+
+class ButtonAnimator:
+    # Keeps one press animation per button and reuses it. A trigger that
+    # arrives within a frame of the previous input is dropped, and one that
+    # arrives before the running animation would finish shortens it so the
+    # feedback never lags behind the keystrokes.
+    def __init__(self, duration=100, shrink=5):
+        self.duration = duration
+        self.shrink = shrink
+        self._animations = {}
+        self._clock = QElapsedTimer()
+        self._clock.start()
+        self._last_trigger = None
+        self.skipped = 0
+
+    def animate(self, button):
+        now = self._clock.elapsed()
+        interval = None if self._last_trigger is None else now - self._last_trigger
+        self._last_trigger = now
+        if interval is not None and interval < FRAME_BUDGET_MS:
+            self.skipped += 1
+            return
+
+        animation = self._animations.get(button)
+        if animation is None:
+            animation = self._create(button)
+        if animation.state() == QPropertyAnimation.State.Running:
+            animation.stop()
+
+        duration = self.duration
+        if interval is not None and interval < duration:
+            duration = max(FRAME_BUDGET_MS, interval)
+        animation.setDuration(duration)
+        animation.start()
+
+    def _create(self, button):
+        size = button.size()
+        animation = QPropertyAnimation(button, b"size", button)
+        animation.setEasingCurve(QEasingCurve.Type.OutQuad)
+        animation.setStartValue(QSize(size.width() - self.shrink, size.height() - self.shrink))
+        animation.setEndValue(size)
+        self._animations[button] = animation
+        return animation
@@ -0,0 +1,43 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import CalculatorEngine, MODES
+
+WORKLOADS = {
+    "integer": ["12 + 7", "123456789 × 987654321", "144 ÷ 12", "2^64", "√(144)", "99 - 100"],
+    "decimal": ["0.1 + 0.2", "3.75 × 1.2", "1 ÷ 3", "2.5^2", "√(2)", "19.99 - 0.01"],
+    "mixed": ["12 + 0.5", "7 ÷ 2", "1/(8)", "50%", "√(10) × 3", "2^0.5"],
+}
+
+
+def measure(engine, expressions, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in engine.evaluate_many(expressions):
+            pass
+        best = min(best, time.perf_counter() - start)
+    return len(expressions) / best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare engine throughput across numeric modes")
+    parser.add_argument("--count", type=int, default=20000, help="expressions per workload")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'workload':<10}" + "".join(f"{mode:>14}" for mode in MODES) + "   (expressions/s)")
+    for name, sample in WORKLOADS.items():
+        expressions = (sample * (args.count // len(sample) + 1))[:args.count]
+        # The workloads repeat a few expressions; without memo_size=0 this
+        # would time memo lookups instead of arithmetic
+        rates = [measure(CalculatorEngine(mode, memo_size=0), expressions, args.repeat) for mode in MODES]
+        print(f"{name:<10}" + "".join(f"{rate:>14,.0f}" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
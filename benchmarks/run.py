@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# GUI benchmarks run without a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from bench_modes import WORKLOADS, measure
+from engine import CalculatorEngine, MODES
+
+SUITES = ("engine", "history", "theme", "keypress", "sessions")
+HISTORY_SIZES = (10, 1000, 100000)
+SESSION_COUNT = 10
+DEFAULT_THRESHOLD = 10.0
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def latency_result(samples, unit="us"):
+    # One metric per percentile; lower is better for all of them
+    scale = 1e6 if unit == "us" else 1e3
+    ordered = sorted(samples)
+    return {
+        f"p50_{unit}": (percentile(ordered, 0.5) * scale, "lower"),
+        f"p99_{unit}": (percentile(ordered, 0.99) * scale, "lower"),
+        f"mean_{unit}": (sum(ordered) / len(ordered) * scale, "lower"),
+    }
+
+
+def bench_engine(args):
+    results = {}
+    for name, sample in WORKLOADS.items():
+        expressions = (sample * (args.count // len(sample) + 1))[:args.count]
+        for mode in MODES:
+            # Arithmetic only; memo hits are measured separately below
+            rate = measure(CalculatorEngine(mode, memo_size=0), expressions, args.repeat)
+            results[f"engine.{name}.{mode}.expressions_per_s"] = (rate, "higher")
+            if name == "integer":
+                rate = measure(CalculatorEngine(mode), expressions, args.repeat)
+                results[f"engine.memo_hit.{mode}.expressions_per_s"] = (rate, "higher")
+    return results
+
+
+def make_window(app, **kwargs):
+    from calculator import ModernCalculator
+    window = ModernCalculator(history_path=None, **kwargs)
+    window.show()
+    app.processEvents()
+    return window
+
+
+def bench_history(app, args):
+    results = {}
+    appends = max(100, args.count // 10)
+    for size in HISTORY_SIZES:
+        window = make_window(app, history_capacity=max(size, 10))
+        window.ensure_history_view()
+        window.add_entries_to_history([(f"{i} + 1", i + 1.0) for i in range(size)])
+        app.processEvents()
+        samples = []
+        for i in range(appends):
+            start = time.perf_counter()
+            window.add_to_history(f"{i} × 2", i * 2.0)
+            samples.append(time.perf_counter() - start)
+        app.processEvents()
+        for metric, value in latency_result(samples).items():
+            results[f"history.add_to_history.{size}.{metric}"] = value
+        window.close()
+    return results
+
+
+def bench_theme(app, args):
+    window = make_window(app)
+    themes = ("dark", "light", "blue")
+    samples = []
+    for i in range(args.repeat * 10):
+        start = time.perf_counter()
+        window.apply_theme(themes[i % len(themes)])
+        app.processEvents()
+        samples.append(time.perf_counter() - start)
+    window.close()
+    return {f"theme.apply_theme.{metric}": value for metric, value in latency_result(samples, "ms").items()}
+
+
+def bench_keypress(app, args):
+    # Time from posting a key press to the next paint of the display label,
+    # which includes the coalescing delay of update_display
+    from PyQt6.QtCore import QEvent, QObject, Qt
+    from PyQt6.QtGui import QKeyEvent
+
+    window = make_window(app)
+    painted = []
+
+    class PaintWatcher(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint:
+                painted.append(time.perf_counter())
+            return False
+
+    watcher = PaintWatcher()
+    window.display_label.installEventFilter(watcher)
+    samples = []
+    keys = (Qt.Key.Key_1, Qt.Key.Key_2, Qt.Key.Key_Backspace)
+    for i in range(args.repeat * 20):
+        key = keys[i % len(keys)]
+        del painted[:]
+        start = time.perf_counter()
+        app.sendEvent(window, QKeyEvent(QEvent.Type.KeyPress, key, Qt.KeyboardModifier.NoModifier))
+        deadline = start + 1.0
+        while not painted and time.perf_counter() < deadline:
+            app.processEvents()
+        if painted:
+            samples.append(painted[0] - start)
+    window.close()
+    if not samples:
+        return {}
+    return {f"keypress.to_paint.{metric}": value for metric, value in latency_result(samples, "ms").items()}
+
+
+def resident_memory():
+    # Current RSS in MiB where /proc is available, otherwise None
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def bench_sessions(app, args):
+    # SESSION_COUNT tabs in one window against SESSION_COUNT windows
+    # One throwaway window first so neither side pays the one-time Qt setup
+    make_window(app).close()
+    app.processEvents()
+    results = {}
+    memory = resident_memory()
+    start = time.perf_counter()
+    window = make_window(app)
+    for _ in range(SESSION_COUNT - 1):
+        window.new_session()
+    app.processEvents()
+    results["sessions.tabs.startup_ms"] = ((time.perf_counter() - start) * 1000, "lower")
+    if memory is not None:
+        results["sessions.tabs.memory_mib"] = (resident_memory() - memory, "lower")
+
+    memory = resident_memory()
+    start = time.perf_counter()
+    windows = [make_window(app) for _ in range(SESSION_COUNT)]
+    app.processEvents()
+    results["sessions.windows.startup_ms"] = ((time.perf_counter() - start) * 1000, "lower")
+    if memory is not None:
+        results["sessions.windows.memory_mib"] = (resident_memory() - memory, "lower")
+    for other in windows + [window]:
+        other.close()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    suites = args.only.split(",") if args.only else SUITES
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        print("Unknown suite: " + ", ".join(sorted(unknown)), file=sys.stderr)
+        return 2
+    metrics = {}
+    if "engine" in suites:
+        metrics.update(bench_engine(args))
+    gui_suites = [suite for suite in suites if suite != "engine"]
+    if gui_suites:
+        try:
+            from PyQt6.QtWidgets import QApplication
+        except ImportError:
+            print("PyQt6 is not installed; skipping " + ", ".join(gui_suites), file=sys.stderr)
+        else:
+            app = QApplication.instance() or QApplication([sys.argv[0]])
+            for suite in gui_suites:
+                metrics.update(GUI_BENCHMARKS[suite](app, args))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "metrics": {name: {"value": value, "better": better} for name, (value, better) in metrics.items()},
+    }
+    for name, (value, _) in metrics.items():
+        print(f"{name:<55}{value:>16,.2f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    return 0
+
+
+def compare(args):
+    # Prints the change of every metric and exits non-zero when one got
+    # worse by more than the threshold
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    with open(args.current, encoding="utf-8") as handle:
+        current = json.load(handle)
+    print(f"{baseline.get('commit') or args.baseline} -> {current.get('commit') or args.current}")
+    regressions = 0
+    for name, entry in current["metrics"].items():
+        previous = baseline["metrics"].get(name)
+        if previous is None or not previous["value"]:
+            continue
+        change = (entry["value"] - previous["value"]) / previous["value"] * 100
+        worse = -change if entry["better"] == "higher" else change
+        flag = ""
+        if worse > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:<55}{previous['value']:>14,.2f}{entry['value']:>14,.2f}{change:>+9.1f}%{flag}")
+    return 1 if regressions else 0
+
+
+GUI_BENCHMARKS = {"history": bench_history, "theme": bench_theme, "keypress": bench_keypress,
+                  "sessions": bench_sessions}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["compare"]:
+        parser = argparse.ArgumentParser(prog="run.py compare", description="Compare two benchmark result files")
+        parser.add_argument("baseline")
+        parser.add_argument("current")
+        parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help="percent change that counts as a regression")
+        return compare(parser.parse_args(argv[1:]))
+
+    parser = argparse.ArgumentParser(description="Run the calculator benchmark suite")
+    parser.add_argument("--only", help="comma separated subset of: " + ", ".join(SUITES))
+    parser.add_argument("--count", type=int, default=20000, help="expressions per engine workload")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
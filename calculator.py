@@ -1,38 +1,186 @@
-import sys
+import argparse
 import math
+import os
+import sys
+import time
+from functools import partial
 from PyQt6.QtWidgets import QGridLayout
-from PyQt6.QtCore import Qt, QSize, QPropertyAnimation, QEasingCurve
-from PyQt6.QtGui import QFont, QFontDatabase, QIcon, QColor
+from PyQt6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QTimer
+from PyQt6.QtGui import QFont, QFontDatabase, QFontMetrics, QIcon, QColor, QKeySequence
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                             QHBoxLayout, QPushButton, QLabel, QScrollArea, 
-                             QFrame, QSizePolicy, QMenu, QInputDialog)
+                             QHBoxLayout, QPushButton, QLabel, QListView, 
+                             QFrame, QSizePolicy, QMenu, QInputDialog, QColorDialog,
+                             QMessageBox, QProgressBar, QFileDialog, QLineEdit, QTabBar)
+
+from animation import ButtonAnimator, FRAME_BUDGET_MS
+from conversion import convert, convert_many, to_base
+from engine import (CalculatorEngine, CalculationError, FLOAT, DECIMAL, FRACTION,
+                    MAX_EXACT_EXPONENT, number_to_text)
+from formatting import NumberFormat, group_digits, GENERAL, SCIENTIFIC, ENGINEERING, MAX_DIGITS
+from history import HistoryStore, DEFAULT_HISTORY_CAPACITY
+from history_log import HistoryLog, DEFAULT_HISTORY_PATH
+from history_index import HistoryIndex
+from history_model import HistoryModel
+from instrumentation import Instrumentation
+from paste import PasteEvaluator, iter_file_lines
+from themes import button_type, theme_stylesheet, custom_stylesheet
+from profiling import StartupProfiler, NullProfiler
+from sessions import SessionState, session_attribute
+from streaming_stats import StreamingStats
+from workers import CalculationWorker
+
+HISTORY_RELOAD_COUNT = 1000
+# History entries indexed for search per idle slice (a few ms)
+HISTORY_INDEX_SLICE = 500
+# Keypad labels that map to a different symbol in expression text
+EXPRESSION_KEYS = {'x²': '²', 'xⁿ': '^'}
+EXPRESSION_ONLY_CHARACTERS = frozenset('()^')
+# Keys that edit the value being entered in statistics mode
+STATISTICS_EDIT_KEYS = frozenset('0123456789.') | {'⌫', '±'}
+# Keys that act on the current value in expression mode too
+CONVERSION_KEYS = frozenset(['HEX', 'BIN', 'OCT', 'UNIT'])
+BASE_NAMES = {16: "hex", 2: "binary", 8: "octal"}
+# Summary fields recorded to history when statistics mode ends
+STATISTICS_HISTORY = ("sum", "mean", "variance", "std", "min", "p25", "p50", "p75", "max")
+
+KEY_MAPPING = {
+    Qt.Key.Key_0: '0',
+    Qt.Key.Key_1: '1',
+    Qt.Key.Key_2: '2',
+    Qt.Key.Key_3: '3',
+    Qt.Key.Key_4: '4',
+    Qt.Key.Key_5: '5',
+    Qt.Key.Key_6: '6',
+    Qt.Key.Key_7: '7',
+    Qt.Key.Key_8: '8',
+    Qt.Key.Key_9: '9',
+    Qt.Key.Key_Plus: '+',
+    Qt.Key.Key_Minus: '-',
+    Qt.Key.Key_Asterisk: '×',
+    Qt.Key.Key_Slash: '÷',
+    Qt.Key.Key_Period: '.',
+    Qt.Key.Key_Enter: '=',
+    Qt.Key.Key_Return: '=',
+    Qt.Key.Key_Backspace: '⌫',
+    Qt.Key.Key_Escape: 'C',
+    Qt.Key.Key_P: '%',
+    Qt.Key.Key_S: '√'
+}
+
+# Timed handlers shown in the performance overlay
+INSTRUMENTED_HANDLERS = ("on_button_click", "calculate_result", "update_display", "flush_display",
+                         "add_to_history", "apply_theme")
+OVERLAY_INTERVAL_MS = 500
+# Long numbers shrink the display font down to this size to fit the label
+DISPLAY_FONT_SIZE = 36
+MIN_DISPLAY_FONT_SIZE = 12
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts", "Montserrat-Regular.ttf")
 
 class ModernCalculator(QMainWindow):
-    def __init__(self):
+    # Input state lives in the active SessionState; tabs swap sessions over
+    # the one widget tree
+    current_input = session_attribute("current_input")
+    stored_value = session_attribute("stored_value")
+    current_operator = session_attribute("current_operator")
+    expression_input = session_attribute("expression_input")
+    last_result = session_attribute("last_result")
+    
+    def __init__(self, history_capacity=DEFAULT_HISTORY_CAPACITY, history_path=DEFAULT_HISTORY_PATH,
+                 profiler=None, client=None):
         super().__init__()
         
+        self.profiler = profiler or NullProfiler()
+        self.instrumentation = Instrumentation()
+        self.overlay = None
+        self.overlay_timer = None
+        self.overlay_sample = (0, time.perf_counter())
         self.setWindowTitle("Modern Calculator")
         self.setMinimumSize(350, 550)
         
-        self.load_fonts()
+        with self.profiler.phase("load_fonts"):
+            self.load_fonts()
         
-        self.current_input = "0"
-        self.stored_value = None
-        self.current_operator = None
-        self.calculation_history = []
+        self.engine = CalculatorEngine()
+        self.session = SessionState()
+        self.sessions = [self.session]
+        self.sessions_created = 1
+        self.session_tabs = None
+        self.calculation_history = HistoryStore(history_capacity)
+        self.history_log = HistoryLog(history_path) if history_path else None
+        self.history_loaded = False
+        self.history_model = None
+        self.history_view = None
         self.history_visible = False
+        self.history_index = None
+        self.history_sync_timer = QTimer(self)
+        self.history_sync_timer.setSingleShot(True)
+        self.history_sync_timer.timeout.connect(self.sync_history_log)
+        self.history_index_timer = QTimer(self)
+        self.history_index_timer.setInterval(0)
+        self.history_index_timer.timeout.connect(self.index_history_slice)
+        self.history_query = ""
+        self.expression_mode = False
+        self.statistics = None
+        self.number_format = NumberFormat()
+        self.last_units = "km mi"
+        self.display_font_size = DISPLAY_FONT_SIZE
+        self._stylesheet = None
+        self.button_animator = ButtonAnimator()
+        self.pending_display_text = None
+        self.display_timer = QTimer(self)
+        self.display_timer.setSingleShot(True)
+        self.display_timer.setInterval(FRAME_BUDGET_MS)
+        self.display_timer.timeout.connect(self.flush_display)
+        self.history_animation = None
+        self.paste_evaluator = None
+        self.progress_bar = None
+        self.worker = None
+        self.background_callback = None
+        # Optional server.CalculatorClient that evaluates expressions
+        self.client = client
         
+        self.init_dispatch()
         self.init_ui()
         
-        self.apply_theme("dark")
+        with self.profiler.phase("apply_theme"):
+            self.apply_theme("dark")
         
     def load_fonts(self):
-        font_id = QFontDatabase.addApplicationFont(":fonts/Montserrat-Regular.ttf")
+        font_id = QFontDatabase.addApplicationFont(FONT_PATH) if os.path.exists(FONT_PATH) else -1
         if font_id != -1:
             self.font_family = QFontDatabase.applicationFontFamilies(font_id)[0]
         else:
             self.font_family = "Arial"
     
+    def load_history(self):
+        # Deferred until the history is first needed so reading the log
+        # stays off the startup path.
+        if self.history_loaded:
+            return
+        self.history_loaded = True
+        if self.history_log is None:
+            return
+        try:
+            entries = self.history_log.read_tail(min(self.calculation_history.capacity, HISTORY_RELOAD_COUNT))
+        except OSError:
+            return
+        for expression, result in entries:
+            self.calculation_history.append(expression, result)
+        self.sync_history_index()
+    
+    def sync_history_index(self):
+        # The search index follows the history in idle slices as entries
+        # arrive, so a search never has to index a large history at once
+        if self.history_index is None:
+            self.history_index = HistoryIndex(self.calculation_history)
+        elif not self.history_index_timer.isActive():
+            self.history_index_timer.start()
+    
+    def index_history_slice(self):
+        if self.history_index.sync(HISTORY_INDEX_SLICE):
+            self.history_index_timer.stop()
+    
     def init_ui(self):
         main_widget = QWidget()
         self.setCentralWidget(main_widget)
@@ -41,82 +189,83 @@ class ModernCalculator(QMainWindow):
         self.main_layout.setContentsMargins(15, 15, 15, 15)
         self.main_layout.setSpacing(15)
         
-        self.init_history_panel()
+        with self.profiler.phase("init_history_panel"):
+            self.init_history_panel()
         
-        self.init_display()
+        with self.profiler.phase("init_display"):
+            self.init_display()
         
-        self.init_buttons()
+        with self.profiler.phase("init_buttons"):
+            self.init_buttons()
         
-        self.init_menu()
+        with self.profiler.phase("init_menu"):
+            self.init_menu()
     
     def init_history_panel(self):
         self.history_container = QFrame()
         self.history_container.setFrameShape(QFrame.Shape.StyledPanel)
         self.history_container.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
         self.history_container.setFixedHeight(0)  # Start collapsed
-        self.history_container.setStyleSheet("background-color: rgba(30, 30, 30, 150); border-radius: 10px;")
-        
-        self.history_scroll = QScrollArea()
-        self.history_scroll.setWidgetResizable(True)
-        self.history_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
-        self.history_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.history_scroll.setStyleSheet("border: none; background: transparent;")
+        self.history_container.setObjectName("historyContainer")
         
-        self.history_content = QWidget()
-        self.history_layout = QVBoxLayout(self.history_content)
-        self.history_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
-        self.history_layout.setContentsMargins(10, 10, 10, 10)
-        self.history_layout.setSpacing(5)
-        
-        self.history_scroll.setWidget(self.history_content)
-        
-        history_container_layout = QVBoxLayout(self.history_container)
-        history_container_layout.setContentsMargins(0, 0, 0, 0)
-        history_container_layout.addWidget(self.history_scroll)
+        # The list view and its model are built on first toggle
+        self.history_container_layout = QVBoxLayout(self.history_container)
+        self.history_container_layout.setContentsMargins(0, 0, 0, 0)
         
         self.main_layout.addWidget(self.history_container)
         
         self.toggle_history_btn = QPushButton("History ▼")
-        self.toggle_history_btn.setStyleSheet("""
-            QPushButton {
-                background-color: rgba(60, 60, 60, 150);
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 5px;
-            }
-            QPushButton:hover {
-                background-color: rgba(80, 80, 80, 150);
-            }
-        """)
+        self.toggle_history_btn.setObjectName("historyToggle")
         self.toggle_history_btn.setFixedHeight(25)
         self.toggle_history_btn.clicked.connect(self.toggle_history)
         self.main_layout.addWidget(self.toggle_history_btn)
     
+    def ensure_history_view(self):
+        if self.history_view is not None:
+            return
+        self.load_history()
+        
+        self.history_model = HistoryModel(self.calculation_history, QFont(self.font_family, 10), self,
+                                          self.number_format)
+        
+        self.history_search = QLineEdit()
+        self.history_search.setObjectName("historySearch")
+        self.history_search.setPlaceholderText("Search: 12 34, 10..20, >100")
+        self.history_search.setClearButtonEnabled(True)
+        self.history_search.textChanged.connect(self.search_history)
+        self.history_container_layout.addWidget(self.history_search)
+        
+        self.history_view = QListView()
+        self.history_view.setModel(self.history_model)
+        self.history_view.setUniformItemSizes(True)
+        self.history_view.setSelectionMode(QListView.SelectionMode.NoSelection)
+        self.history_view.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
+        self.history_view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.history_view.setObjectName("historyView")
+        
+        self.history_container_layout.addWidget(self.history_view)
+    
     def init_display(self):
         display_frame = QFrame()
         display_frame.setFrameShape(QFrame.Shape.StyledPanel)
-        display_frame.setStyleSheet("""
-            QFrame {
-                background-color: rgba(40, 40, 40, 150);
-                border-radius: 15px;
-            }
-        """)
-        
-        display_layout = QVBoxLayout(display_frame)
+        display_frame.setObjectName("displayFrame")
+        
+        self.display_layout = display_layout = QVBoxLayout(display_frame)
         display_layout.setContentsMargins(20, 15, 20, 15)
         display_layout.setSpacing(5)
         
         self.history_label = QLabel("")
         self.history_label.setAlignment(Qt.AlignmentFlag.AlignRight)
-        self.history_label.setStyleSheet("color: rgba(200, 200, 200, 180);")
+        self.history_label.setObjectName("expressionLabel")
         self.history_label.setFont(QFont(self.font_family, 12))
         display_layout.addWidget(self.history_label)
         
         self.display_label = QLabel("0")
         self.display_label.setAlignment(Qt.AlignmentFlag.AlignRight)
-        self.display_label.setStyleSheet("color: white;")
-        self.display_label.setFont(QFont(self.font_family, 36, QFont.Weight.Bold))
+        self.display_label.setObjectName("displayLabel")
+        self.display_label.setFont(QFont(self.font_family, DISPLAY_FONT_SIZE, QFont.Weight.Bold))
+        # The label never widens the window; long text shrinks its font
+        self.display_label.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Preferred)
         display_layout.addWidget(self.display_label)
         
         self.main_layout.addWidget(display_frame)
@@ -131,7 +280,9 @@ class ModernCalculator(QMainWindow):
             ('4', 2, 0), ('5', 2, 1), ('6', 2, 2), ('-', 2, 3),
             ('1', 3, 0), ('2', 3, 1), ('3', 3, 2), ('+', 3, 3),
             ('⌫', 4, 0), ('0', 4, 1), ('.', 4, 2), ('=', 4, 3),
-            ('√', 5, 0), ('x²', 5, 1), ('xⁿ', 5, 2), ('1/x', 5, 3)
+            ('√', 5, 0), ('x²', 5, 1), ('xⁿ', 5, 2), ('1/x', 5, 3),
+            ('HEX', 6, 0), ('BIN', 6, 1), ('OCT', 6, 2), ('Σ', 6, 3),
+            ('UNIT', 7, 0)
         ]
         
         self.buttons = {}
@@ -139,88 +290,27 @@ class ModernCalculator(QMainWindow):
             btn = QPushButton(text)
             btn.setFixedSize(60, 60)
             btn.setFont(QFont(self.font_family, 18))
-            
-            if text in ['C', '±', '%', '⌫']:
-                btn.setStyleSheet(self.get_button_style("function"))
-            elif text in ['÷', '×', '-', '+', '=']:
-                btn.setStyleSheet(self.get_button_style("operator"))
-            elif text in ['√', 'x²', 'xⁿ', '1/x']:
-                btn.setStyleSheet(self.get_button_style("scientific"))
-            else:
-                btn.setStyleSheet(self.get_button_style("number"))
+            btn.setProperty("buttonType", button_type(text))
             
             btn.clicked.connect(self.on_button_click)
             button_grid.addWidget(btn, row, col)
             self.buttons[text] = btn
         
-        button_grid.setRowStretch(6, 1)
+        self.buttons['Σ'].setCheckable(True)
+        button_grid.setRowStretch(8, 1)
         
         self.main_layout.addLayout(button_grid)
     
-    def get_button_style(self, button_type):
-        base_style = """
-            QPushButton {
-                border: none;
-                border-radius: 30px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                opacity: 0.9;
-            }
-            QPushButton:pressed {
-                opacity: 0.8;
-            }
-        """
-        
-        if button_type == "number":
-            return f"""
-                {base_style}
-                QPushButton {{
-                    background-color: #505050;
-                    color: white;
-                }}
-                QPushButton:hover {{
-                    background-color: #606060;
-                }}
-            """
-        elif button_type == "operator":
-            return f"""
-                {base_style}
-                QPushButton {{
-                    background-color: #FF9500;
-                    color: white;
-                }}
-                QPushButton:hover {{
-                    background-color: #FFAA33;
-                }}
-            """
-        elif button_type == "function":
-            return f"""
-                {base_style}
-                QPushButton {{
-                    background-color: #D4D4D2;
-                    color: black;
-                }}
-                QPushButton:hover {{
-                    background-color: #E4E4E2;
-                }}
-            """
-        elif button_type == "scientific":
-            return f"""
-                {base_style}
-                QPushButton {{
-                    background-color: #3A3A3A;
-                    color: white;
-                }}
-                QPushButton:hover {{
-                    background-color: #4A4A4A;
-                }}
-            """
-    
     def init_menu(self):
-        menu_bar = self.menuBar()
-        
-        settings_menu = QMenu("Settings", self)
+        # Entries are filled in the first time the menu is opened
+        self.settings_menu = QMenu("Settings", self)
+        self.settings_menu.aboutToShow.connect(self.populate_settings_menu)
+        self.menuBar().addMenu(self.settings_menu)
+    
+    def populate_settings_menu(self):
+        settings_menu = self.settings_menu
+        if not settings_menu.isEmpty():
+            return
         
         theme_menu = settings_menu.addMenu("Theme")
         theme_menu.addAction("Dark", lambda: self.apply_theme("dark"))
@@ -228,201 +318,600 @@ class ModernCalculator(QMainWindow):
         theme_menu.addAction("Blue", lambda: self.apply_theme("blue"))
         theme_menu.addAction("Custom...", self.set_custom_theme)
         
-        settings_menu.addAction("Font Size...", self.set_font_size)
+
+        mode_menu = settings_menu.addMenu("Number Mode")
+        mode_menu.addAction("Float", lambda: self.set_number_mode(FLOAT))
+        mode_menu.addAction("Decimal...", self.set_decimal_mode)
+        mode_menu.addAction("Fraction", lambda: self.set_number_mode(FRACTION))
+        
+        format_menu = settings_menu.addMenu("Number Format")
+        format_menu.addAction("General", lambda: self.set_number_format(notation=GENERAL))
+        format_menu.addAction("Scientific", lambda: self.set_number_format(notation=SCIENTIFIC))
+        format_menu.addAction("Engineering", lambda: self.set_number_format(notation=ENGINEERING))
+        format_menu.addAction("Significant Digits...", self.set_significant_digits)
+        grouping_action = format_menu.addAction("Digit Grouping")
+        grouping_action.setCheckable(True)
+        grouping_action.setChecked(self.number_format.grouping)
+        grouping_action.toggled.connect(lambda checked: self.set_number_format(grouping=checked))
+        
+        expression_action = settings_menu.addAction("Expression Mode")
+        expression_action.setCheckable(True)
+        expression_action.setChecked(self.expression_mode)
+        expression_action.toggled.connect(self.set_expression_mode)
         
-        menu_bar.addMenu(settings_menu)
+        settings_menu.addAction("Evaluate Over Range...", self.evaluate_over_range)
+        settings_menu.addAction("Statistics From File...", self.load_statistics_file)
+        settings_menu.addAction("Convert History Column...", self.convert_history_column)
+        settings_menu.addAction("Font Size...", self.set_font_size)
+        settings_menu.addAction("New Session (Ctrl+T)", self.new_session)
+        settings_menu.addSeparator()
+        settings_menu.addAction("Performance Overlay (F12)", self.toggle_overlay)
+        settings_menu.addAction("Export Performance Data...", self.export_performance_data)
     
     def apply_theme(self, theme_name):
-        if theme_name == "dark":
-            self.setStyleSheet("""
-                QMainWindow {
-                    background-color: #121212;
-                }
-                QLabel {
-                    color: white;
-                }
-                QMenuBar {
-                    background-color: #1E1E1E;
-                    color: white;
-                }
-                QMenuBar::item:selected {
-                    background-color: #333333;
-                }
-                QMenu {
-                    background-color: #1E1E1E;
-                    color: white;
-                    border: 1px solid #333;
-                }
-                QMenu::item:selected {
-                    background-color: #333333;
-                }
-            """)
-        elif theme_name == "light":
-            self.setStyleSheet("""
-                QMainWindow {
-                    background-color: #F5F5F5;
-                }
-                QLabel {
-                    color: black;
-                }
-                QMenuBar {
-                    background-color: #E0E0E0;
-                    color: black;
-                }
-                QMenuBar::item:selected {
-                    background-color: #CCCCCC;
-                }
-                QMenu {
-                    background-color: #E0E0E0;
-                    color: black;
-                    border: 1px solid #999;
-                }
-                QMenu::item:selected {
-                    background-color: #CCCCCC;
-                }
-            """)
-            for text, btn in self.buttons.items():
-                if text in ['C', '±', '%', '⌫']:
-                    btn.setStyleSheet(self.get_button_style("function"))
-                elif text in ['÷', '×', '-', '+', '=']:
-                    btn.setStyleSheet(self.get_button_style("operator"))
-                elif text in ['√', 'x²', 'xⁿ', '1/x']:
-                    btn.setStyleSheet(self.get_button_style("scientific"))
-                else:
-                    btn.setStyleSheet(self.get_button_style("number"))
-        elif theme_name == "blue":
-            self.setStyleSheet("""
-                QMainWindow {
-                    background-color: #0A192F;
-                }
-                QLabel {
-                    color: #CCD6F6;
-                }
-                QMenuBar {
-                    background-color: #112240;
-                    color: #CCD6F6;
-                }
-                QMenuBar::item:selected {
-                    background-color: #233554;
-                }
-                QMenu {
-                    background-color: #112240;
-                    color: #CCD6F6;
-                    border: 1px solid #233554;
-                }
-                QMenu::item:selected {
-                    background-color: #233554;
-                }
-            """)
+        with self.instrumentation.measure("apply_theme"):
+            self.apply_stylesheet(theme_stylesheet(theme_name))
     
     def set_custom_theme(self):
-        color = QColor.getColorDialog(QColor(18, 18, 18), self, "Select Background Color")
+        color = QColorDialog.getColor(QColor(18, 18, 18), self, "Select Background Color")
         if color.isValid():
-            r, g, b = color.red(), color.green(), color.blue()
-            self.setStyleSheet(f"""
-                QMainWindow {{
-                    background-color: rgb({r}, {g}, {b});
-                }}
-                QLabel {{
-                    color: {'white' if (r + g + b) < 384 else 'black'};
-                }}
-                QMenuBar {{
-                    background-color: rgb({r*0.8}, {g*0.8}, {b*0.8});
-                    color: {'white' if (r + g + b) < 384 else 'black'};
-                }}
-                QMenuBar::item:selected {{
-                    background-color: rgb({r*0.6}, {g*0.6}, {b*0.6});
-                }}
-                QMenu {{
-                    background-color: rgb({r*0.8}, {g*0.8}, {b*0.8});
-                    color: {'white' if (r + g + b) < 384 else 'black'};
-                    border: 1px solid rgb({r*0.6}, {g*0.6}, {b*0.6});
-                }}
-                QMenu::item:selected {{
-                    background-color: rgb({r*0.6}, {g*0.6}, {b*0.6});
-                }}
-            """)
+            self.apply_stylesheet(custom_stylesheet(color.red(), color.green(), color.blue()))
+    
+    def apply_stylesheet(self, stylesheet):
+        # Stylesheets come from the theme cache, so an identical object means
+        # the theme is already applied and Qt can skip the re-polish.
+        if stylesheet is self._stylesheet:
+            return
+        self._stylesheet = stylesheet
+        self.setStyleSheet(stylesheet)
+    
+    def set_decimal_mode(self):
+        precision, ok = QInputDialog.getInt(self, "Decimal Mode", "Significant digits (1-1000):",
+                                            self.engine.precision, 1, 1000)
+        if ok:
+            self.set_number_mode(DECIMAL, precision)
+    
+    def set_number_mode(self, mode, precision=None):
+        self.engine.set_mode(mode, precision)
+        if self.stored_value is not None:
+            try:
+                self.stored_value = self.engine.coerce(self.stored_value)
+            except CalculationError:
+                self.show_error()
+                return
+        self.update_display()
+    
+    def evaluate_over_range(self):
+        expression, ok = QInputDialog.getText(self, "Evaluate Over Range", "Expression in x:",
+                                              text="x² + 3x")
+        if not ok or not expression.strip():
+            return
+        bounds, ok = QInputDialog.getText(self, "Evaluate Over Range", "Start, stop, step:",
+                                          text="0, 1000000, 1")
+        if not ok:
+            return
+        
+        # Imported here so NumPy stays off the normal startup path
+        from vectorized import evaluate_vector, summarize, value_range
+        
+        try:
+            parts = [float(part) for part in bounds.split(",")]
+            if len(parts) not in (2, 3):
+                raise ValueError("Enter a start, a stop and an optional step")
+            results = evaluate_vector(expression, value_range(*parts), engine=self.engine)
+        except (ValueError, CalculationError) as exc:
+            QMessageBox.warning(self, "Evaluate Over Range", str(exc))
+            return
+        
+        summary = summarize(results)
+        lines = [f"{expression} over [{bounds}]", ""]
+        lines += [f"{name}: {value:g}" for name, value in summary.items()]
+        QMessageBox.information(self, "Evaluate Over Range", "\n".join(lines))
+    
+    def set_number_format(self, digits=None, notation=None, grouping=None):
+        current = self.number_format
+        self.number_format = NumberFormat(digits or current.digits, notation or current.notation,
+                                          current.grouping if grouping is None else grouping)
+        if self.history_model is not None:
+            self.history_model.set_number_format(self.number_format)
+        if not self.expression_mode:
+            self.update_display()
+    
+    def set_significant_digits(self):
+        digits, ok = QInputDialog.getInt(self, "Significant Digits", f"Digits shown (1-{MAX_DIGITS}):",
+                                         self.number_format.digits, 1, MAX_DIGITS)
+        if ok:
+            self.set_number_format(digits=digits)
     
     def set_font_size(self):
         size, ok = QInputDialog.getInt(self, "Font Size", "Enter font size (12-36):", 
-                                      self.display_label.font().pointSize(), 12, 36)
+                                      self.display_font_size, 12, 36)
         if ok:
-            self.display_label.setFont(QFont(self.font_family, size, QFont.Weight.Bold))
+            self.display_font_size = size
+            self.fit_display_font()
     
     def toggle_history(self):
+        self.ensure_history_view()
         self.history_visible = not self.history_visible
         
-        animation = QPropertyAnimation(self.history_container, b"maximumHeight")
-        animation.setDuration(300)
-        animation.setEasingCurve(QEasingCurve.Type.InOutQuad)
+        animation = self.history_animation
+        if animation is None:
+            animation = QPropertyAnimation(self.history_container, b"maximumHeight", self)
+            animation.setDuration(300)
+            animation.setEasingCurve(QEasingCurve.Type.InOutQuad)
+            self.history_animation = animation
+        # Reversing mid-slide continues from the current height
+        animation.stop()
+        animation.setStartValue(self.history_container.maximumHeight())
         
         if self.history_visible:
             self.toggle_history_btn.setText("History ▲")
-            content_height = self.history_content.sizeHint().height() + 20
+            self.toggle_history_btn.setToolTip(
+                f"{len(self.calculation_history)} entries, "
+                f"{self.calculation_history.memory_usage() / 1024:.1f} KiB")
+            row_height = max(self.history_view.sizeHintForRow(0), 0)
+            content_height = (row_height * self.history_model.rowCount() + 20
+                              + self.history_search.sizeHint().height())
             max_height = min(200, content_height)  # Cap at 200px
-            animation.setStartValue(0)
             animation.setEndValue(max_height)
         else:
             self.toggle_history_btn.setText("History ▼")
-            animation.setStartValue(self.history_container.height())
             animation.setEndValue(0)
         
         animation.start()
     
     def add_to_history(self, expression, result):
-        self.calculation_history.append((expression, result))
+        with self.instrumentation.measure("add_to_history"):
+            self.load_history()
+            if self.history_model is not None:
+                self.history_model.append(expression, result)
+            else:
+                self.calculation_history.append(expression, result)
+            if self.history_log is not None:
+                try:
+                    self.history_log.append(expression, result)
+                except OSError:
+                    self.history_log = None
+                self.schedule_history_sync()
+            self.sync_history_index()
+            self.refresh_history_search()
+    
+    def schedule_history_sync(self):
+        # Appends reach the OS at once; the batched fsync of a short burst
+        # runs on a timer instead of waiting for the next append
+        if (self.history_log is not None and self.history_log.pending()
+                and not self.history_sync_timer.isActive()):
+            self.history_sync_timer.start(int(self.history_log.sync_interval * 1000))
+    
+    def sync_history_log(self):
+        if self.history_log is not None:
+            try:
+                self.history_log.sync()
+            except OSError:
+                self.history_log = None
+    
+    def search_history(self, query):
+        # The index is kept in step with the history (sync_history_index),
+        # so each keystroke re-queries without a rescan.
+        self.history_query = query.strip()
+        if not self.history_query:
+            self.history_model.set_filter(None)
+            return
+        self.sync_history_index()
+        self.history_model.set_filter(self.history_index.search(self.history_query))
+    
+    def refresh_history_search(self):
+        if self.history_query and self.history_model is not None and not self.history_model.deferred:
+            self.search_history(self.history_query)
+    
+    def add_entries_to_history(self, entries):
+        self.load_history()
+        if self.history_model is not None:
+            self.history_model.extend(entries)
+        else:
+            for expression, result in entries:
+                self.calculation_history.append(expression, result)
+        if self.history_log is not None:
+            try:
+                self.history_log.append_many(entries)
+            except OSError:
+                self.history_log = None
+            self.schedule_history_sync()
+        self.sync_history_index()
+        self.refresh_history_search()
+    
+    def paste_from_clipboard(self):
+        text = QApplication.clipboard().text().strip()
+        if not text:
+            return
         
-        for i in reversed(range(self.history_layout.count())): 
-            self.history_layout.itemAt(i).widget().setParent(None)
+        if '\n' not in text:
+            # A single number replaces the input in one step; a single
+            # expression is typed into expression mode or evaluated.
+            if self.expression_mode:
+                self.expression_input += text
+                self.set_display_text(self.expression_input)
+                return
+            try:
+                self.engine.number(text)
+            except CalculationError:
+                pass
+            else:
+                self.current_input = text
+                self.update_display()
+                return
         
-        for expr, res in reversed(self.calculation_history[-10:]):  # Show last 10 items
-            history_item = QLabel(f"{expr} = {res}")
-            history_item.setStyleSheet("color: white; background: transparent;")
-            history_item.setFont(QFont(self.font_family, 10))
-            self.history_layout.addWidget(history_item)
+        if self.statistics is not None:
+            # In statistics mode pasted lines are values for the summary
+            self.ensure_paste_evaluator().start(text, self.add_statistics_entries)
+            return
+        if self.history_model is not None:
+            # The list catches up once at the end instead of relaying out
+            # on every batch
+            self.history_model.defer_updates(True)
+        self.ensure_paste_evaluator().start(text)
+    
+    def ensure_paste_evaluator(self):
+        if self.paste_evaluator is None:
+            self.paste_evaluator = PasteEvaluator(self.engine, self.add_entries_to_history, self)
+            self.paste_evaluator.progress.connect(self.on_paste_progress)
+            self.paste_evaluator.finished.connect(self.on_paste_finished)
+        return self.paste_evaluator
+    
+    def feeding_statistics(self):
+        return self.paste_evaluator is not None and self.paste_evaluator.sink == self.add_statistics_entries
+    
+    def ensure_progress_bar(self):
+        if self.progress_bar is None:
+            self.progress_bar = QProgressBar()
+            self.progress_bar.setObjectName("pasteProgress")
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setFixedHeight(6)
+            self.progress_bar.setTextVisible(False)
+            self.display_layout.addWidget(self.progress_bar)
+        return self.progress_bar
+    
+    def on_paste_progress(self, percent):
+        progress_bar = self.ensure_progress_bar()
+        progress_bar.setValue(percent)
+        progress_bar.show()
+        if self.feeding_statistics():
+            self.history_label.setText(f"Σ reading values… {self.paste_evaluator.evaluated}")
+        else:
+            self.history_label.setText(f"Evaluating pasted lines… {self.paste_evaluator.evaluated}")
+    
+    def on_paste_finished(self, evaluated, failed):
+        if self.progress_bar is not None:
+            self.progress_bar.hide()
+        if self.feeding_statistics():
+            summary = self.statistics_text() if self.statistics is not None else ""
+        else:
+            if self.history_model is not None:
+                self.history_model.defer_updates(False)
+                self.refresh_history_search()
+            summary = f"Pasted {evaluated} results"
+        if failed:
+            summary += f", {failed} lines failed"
+        self.history_label.setText(summary)
+    
+    def run_in_background(self, operation, args, callback):
+        # The callback receives the result on the GUI thread; failures and
+        # timeouts show the usual error.
+        if self.worker is None:
+            self.worker = CalculationWorker(parent=self)
+            self.worker.finished.connect(self.on_background_finished)
+            self.worker.failed.connect(self.on_background_failed)
+            self.worker.busy_changed.connect(self.set_busy)
+        self.background_callback = callback
+        self.worker.submit(self.engine, operation, *args)
+    
+    def is_busy(self):
+        return self.worker is not None and self.worker.is_busy()
+    
+    def on_background_finished(self, job_id, result):
+        callback, self.background_callback = self.background_callback, None
+        if callback is not None:
+            callback(result)
+    
+    def on_background_failed(self, job_id, message):
+        self.background_callback = None
+        self.show_error()
+        self.history_label.setText(message)
+    
+    def set_busy(self, busy):
+        self.display_label.setProperty("busy", busy)
+        self.display_label.style().polish(self.display_label)
+        if busy:
+            self.set_display_text("…")
+        elif self.pending_display_text == "…":
+            self.update_display()
+    
+    def toggle_overlay(self):
+        if self.overlay is None:
+            self.overlay = QLabel(self)
+            self.overlay.setObjectName("perfOverlay")
+            self.overlay.setFont(QFont("monospace", 9))
+            self.overlay.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+            self.overlay_timer = QTimer(self)
+            self.overlay_timer.setInterval(OVERLAY_INTERVAL_MS)
+            self.overlay_timer.timeout.connect(self.refresh_overlay)
+        if self.overlay.isVisible():
+            self.overlay_timer.stop()
+            self.overlay.hide()
+            return
+        self.overlay_sample = (self.instrumentation.counters.get("events", 0), time.perf_counter())
+        self.refresh_overlay()
+        self.overlay.move(10, self.menuBar().height() + 5)
+        self.overlay.show()
+        self.overlay.raise_()
+        self.overlay_timer.start()
+    
+    def refresh_overlay(self):
+        instrumentation = self.instrumentation
+        events = instrumentation.counters.get("events", 0)
+        now = time.perf_counter()
+        previous_events, previous_time = self.overlay_sample
+        self.overlay_sample = (events, now)
+        rate = (events - previous_events) / max(now - previous_time, 1e-9)
+        memo = self.engine.memo.stats()
+        lines = [f"{rate:7.1f} events/s  {len(self.findChildren(QWidget))} widgets  "
+                 f"memo {memo['hit_rate']:.0%} of {memo['hits'] + memo['misses']}"]
+        for name in INSTRUMENTED_HANDLERS:
+            summary = instrumentation.histogram(name).summary()
+            lines.append(f"{name:<17}{summary.get('p50_ms', 0):7.3f} {summary.get('p99_ms', 0):7.3f} ms"
+                         f"  ×{summary['count']}")
+        self.overlay.setText("\n".join(lines))
+        self.overlay.adjustSize()
+    
+    def export_performance_data(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Performance Data", "calculator-performance.json",
+                                              "JSON (*.json)")
+        if not path:
+            return
+        try:
+            self.instrumentation.export(path, widgets=len(self.findChildren(QWidget)),
+                                        skipped_animations=self.button_animator.skipped,
+                                        memo=self.engine.memo.stats())
+        except OSError as exc:
+            QMessageBox.warning(self, "Export Performance Data", str(exc))
+    
+    def closeEvent(self, event):
+        if self.worker is not None:
+            self.worker.shutdown()
+        if self.client is not None:
+            self.client.close()
+        if self.history_log is not None:
+            self.history_log.close()
+        super().closeEvent(event)
+    
+    def init_dispatch(self):
+        # Built once; keypad clicks, key presses and typed text all resolve
+        # a button label to its handler through this table.
+        handlers = {digit: partial(self.handle_number, digit) for digit in '0123456789'}
+        handlers.update({op: partial(self.handle_operator, op) for op in ('+', '-', '×', '÷')})
+        handlers.update({
+            '.': self.handle_decimal,
+            '=': self.handle_equals,
+            'C': self.handle_clear,
+            '⌫': self.handle_backspace,
+            '±': self.handle_plus_minus,
+            '%': self.handle_percent,
+            '√': self.handle_square_root,
+            'x²': partial(self.handle_power, 2),
+            'xⁿ': partial(self.handle_power, None),
+            '1/x': self.handle_reciprocal,
+            'HEX': partial(self.handle_base, 16),
+            'BIN': partial(self.handle_base, 2),
+            'OCT': partial(self.handle_base, 8),
+            'UNIT': self.handle_unit_conversion,
+        })
+        self.button_handlers = handlers
     
     def on_button_click(self):
-        sender = self.sender()
-        button_text = sender.text()
-        
-        self.animate_button(sender)
-        
-        # Handle button press
-        if button_text in '0123456789':
-            self.handle_number(button_text)
-        elif button_text == '.':
-            self.handle_decimal()
-        elif button_text in ['+', '-', '×', '÷']:
-            self.handle_operator(button_text)
-        elif button_text == '=':
-            self.handle_equals()
-        elif button_text == 'C':
+        with self.instrumentation.measure("on_button_click"):
+            sender = self.sender()
+            self.animate_button(sender)
+            self.dispatch(sender.text())
+    
+    def dispatch(self, button_text):
+        self.instrumentation.count("events")
+        # While a background calculation runs only Clear (which cancels it)
+        # is accepted
+        if button_text != 'C' and self.is_busy():
+            return
+        if self.statistics is not None or button_text == 'Σ':
+            self.handle_statistics_key(button_text)
+            return
+        if self.expression_mode and button_text not in CONVERSION_KEYS:
+            self.handle_expression_key(button_text)
+            return
+        handler = self.button_handlers.get(button_text)
+        if handler is not None:
+            handler()
+    
+    def ensure_session_tabs(self):
+        # The tab bar only appears once a second session is opened
+        if self.session_tabs is not None:
+            return
+        self.session_tabs = QTabBar()
+        self.session_tabs.setObjectName("sessionTabs")
+        self.session_tabs.setTabsClosable(True)
+        self.session_tabs.setExpanding(False)
+        self.session_tabs.setDrawBase(False)
+        self.session_tabs.addTab("Session 1")
+        self.session_tabs.currentChanged.connect(self.switch_session)
+        self.session_tabs.tabCloseRequested.connect(self.close_session)
+        self.main_layout.insertWidget(0, self.session_tabs)
+    
+    def new_session(self):
+        self.ensure_session_tabs()
+        self.sessions_created += 1
+        self.sessions.append(SessionState())
+        index = self.session_tabs.addTab(f"Session {self.sessions_created}")
+        self.session_tabs.setCurrentIndex(index)
+    
+    def switch_session(self, index):
+        if index < 0 or self.sessions[index] is self.session:
+            return
+        # A pending background result belongs to the session it started in
+        if self.worker is not None:
+            self.background_callback = None
+            self.worker.cancel()
+        self.session.history_text = self.history_label.text()
+        self.session = self.sessions[index]
+        self.history_label.setText(self.session.history_text)
+        if self.expression_mode:
+            self.set_display_text(self.expression_input or "0")
+        else:
+            self.update_display()
+    
+    def close_session(self, index):
+        if len(self.sessions) == 1:
+            return
+        # Removing the tab makes Qt select a neighbour, which switches to it
+        del self.sessions[index]
+        self.session_tabs.removeTab(index)
+    
+    def cycle_session(self):
+        if self.session_tabs is not None:
+            self.session_tabs.setCurrentIndex((self.session_tabs.currentIndex() + 1) % len(self.sessions))
+    
+    def set_expression_mode(self, enabled):
+        self.expression_mode = enabled
+        self.expression_input = ""
+        self.handle_clear()
+    
+    def handle_expression_key(self, text):
+        if text == '=':
+            self.evaluate_expression()
+            return
+        if text == 'C':
+            self.expression_input = ""
+        elif text == '⌫':
+            self.expression_input = self.expression_input[:-1]
+        elif text == '±':
+            self.expression_input = f"-({self.expression_input})"
+        elif text == '1/x':
+            self.expression_input = f"1/({self.expression_input})"
+        else:
+            self.expression_input += EXPRESSION_KEYS.get(text, text)
+        self.set_display_text(self.expression_input or "0")
+    
+    def toggle_statistics(self):
+        # Values entered, pasted or read from a file while the mode is on are
+        # summarized in constant memory; leaving the mode records the summary
+        # to history and puts the mean on the display.
+        if self.statistics is None:
+            self.statistics = StreamingStats()
+            self.current_input = "0"
+            self.show_statistics()
+        else:
+            if self.feeding_statistics():
+                self.paste_evaluator.cancel()
+            self.record_statistics()
+            self.statistics = None
+        self.buttons['Σ'].setChecked(self.statistics is not None)
+    
+    def handle_statistics_key(self, text):
+        if text == 'Σ':
+            self.toggle_statistics()
+        elif text in ('=', '+'):
+            self.add_statistics_value()
+        elif text == 'C':
             self.handle_clear()
-        elif button_text == '⌫':
-            self.handle_backspace()
-        elif button_text == '±':
-            self.handle_plus_minus()
-        elif button_text == '%':
-            self.handle_percent()
-        elif button_text == '√':
-            self.handle_square_root()
-        elif button_text == 'x²':
-            self.handle_power(2)
-        elif button_text == 'xⁿ':
-            self.handle_power(None)  
-        elif button_text == '1/x':
-            self.handle_reciprocal()
+            self.statistics = StreamingStats()
+            self.show_statistics()
+        elif text in STATISTICS_EDIT_KEYS:
+            self.button_handlers[text]()
+    
+    def add_statistics_value(self):
+        try:
+            value = self.engine.number(self.current_input)
+        except CalculationError:
+            self.show_error()
+            return
+        self.statistics.add(value)
+        self.current_input = "0"
+        self.show_statistics()
+    
+    def add_statistics_entries(self, entries):
+        if self.statistics is not None:
+            self.statistics.extend(value for _, value in entries)
+    
+    def statistics_text(self):
+        statistics = self.statistics
+        text = f"Σ n={statistics.count}"
+        if statistics.count:
+            text += f"  mean={statistics.mean:g}  σ={math.sqrt(statistics.variance()):g}"
+        return text
+    
+    def show_statistics(self):
+        self.history_label.setText(self.statistics_text())
+        self.update_display()
+    
+    def record_statistics(self):
+        summary = self.statistics.summary()
+        count = summary["count"]
+        if not count:
+            self.history_label.setText("")
+            return
+        self.add_entries_to_history([(f"{name}(n={count})", summary[name]) for name in STATISTICS_HISTORY])
+        self.show_result(summary["mean"])
+        self.history_label.setText(f"Σ summary of {count} values added to history")
+        self.update_display()
+    
+    def load_statistics_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Statistics From File", "",
+                                              "Text files (*.txt *.csv);;All files (*)")
+        if not path:
+            return
+        try:
+            size = os.path.getsize(path)
+        except OSError as exc:
+            QMessageBox.warning(self, "Statistics From File", str(exc))
+            return
+        if self.statistics is None:
+            self.toggle_statistics()
+        self.ensure_paste_evaluator().start_lines(iter_file_lines(path), size, self.add_statistics_entries)
+    
+    def evaluate_expression(self):
+        expression = self.expression_input
+        if not expression:
+            return
+        if self.engine.is_expensive("evaluate", expression):
+            self.run_in_background("evaluate", (expression,),
+                                   partial(self.finish_expression, expression))
+            return
+        try:
+            if self.client is not None:
+                result = self.evaluate_remote(expression)
+            else:
+                result = self.engine.evaluate(expression)
+        except CalculationError:
+            self.expression_input = ""
+            self.show_error()
+            return
+        self.finish_expression(expression, result)
+    
+    def evaluate_remote(self, expression):
+        # Falls back to the local engine for good if the server goes away
+        try:
+            value = self.client.evaluate(expression, self.engine.mode,
+                                         self.engine.precision if self.engine.mode == DECIMAL else None)
+        except OSError:
+            self.client.close()
+            self.client = None
+            return self.engine.evaluate(expression)
+        return self.engine.number(value) if isinstance(value, str) else self.engine.coerce(value)
+    
+    def finish_expression(self, expression, result):
+        self.add_to_history(expression, result)
+        self.history_label.setText(f"{expression} =")
+        self.expression_input = self.show_result(result)
+        self.update_display()
     
     def animate_button(self, button):
-        animation = QPropertyAnimation(button, b"size")
-        animation.setDuration(100)
-        animation.setEasingCurve(QEasingCurve.Type.OutQuad)
-        
-        original_size = button.size()
-        animation.setStartValue(QSize(original_size.width() - 5, original_size.height() - 5))
-        animation.setEndValue(original_size)
-        
-        animation.start()
+        self.button_animator.animate(button)
     
     def handle_number(self, num):
         if self.current_input == "0":
@@ -439,22 +928,32 @@ class ModernCalculator(QMainWindow):
     
     def handle_operator(self, op):
         if self.stored_value is None:
-            self.stored_value = float(self.current_input)
-        else:
-            self.calculate_result()
+            try:
+                self.stored_value = self.engine.number(self.current_input)
+            except CalculationError:
+                self.show_error()
+                return
+        elif self.current_operator is not None and not self.calculate_result():
+            return
         
         self.current_operator = op
         self.current_input = "0"
-        self.history_label.setText(f"{self.stored_value} {self.current_operator}")
+        self.history_label.setText(f"{self.number_format.format(self.stored_value)} {self.current_operator}")
     
     def handle_equals(self):
         if self.stored_value is not None and self.current_operator is not None:
-            expression = f"{self.stored_value} {self.current_operator} {self.current_input}"
-            self.calculate_result()
-            self.add_to_history(expression, self.current_input)
-            self.history_label.setText("")
+            expression = (f"{self.number_format.format(self.stored_value)} {self.current_operator} "
+                          f"{self.format_display(self.current_input)}")
+            if self.calculate_result():
+                self.add_to_history(expression, self.stored_value)
+                self.history_label.setText("")
     
     def handle_clear(self):
+        if self.paste_evaluator is not None:
+            self.paste_evaluator.cancel()
+        if self.worker is not None:
+            self.background_callback = None
+            self.worker.cancel()
         self.current_input = "0"
         self.stored_value = None
         self.current_operator = None
@@ -470,113 +969,262 @@ class ModernCalculator(QMainWindow):
     
     def handle_plus_minus(self):
         if self.current_input != "0":
+            showing_result = self.last_result is not None and self.last_result[0] == self.current_input
             if self.current_input[0] == '-':
                 self.current_input = self.current_input[1:]
             else:
                 self.current_input = '-' + self.current_input
+            if showing_result:
+                self.last_result = (self.current_input, -self.last_result[1])
             self.update_display()
     
     def handle_percent(self):
-        value = float(self.current_input) / 100
-        self.current_input = str(value)
-        self.update_display()
+        self.apply_unary("percent")
     
     def handle_square_root(self):
-        value = math.sqrt(float(self.current_input))
-        self.current_input = str(value)
-        self.add_to_history(f"√({self.current_input})", self.current_input)
-        self.update_display()
+        self.apply_unary("square_root", "√({})")
     
     def handle_power(self, exponent):
         if exponent is None:
-            exponent, ok = QInputDialog.getDouble(self, "Exponent", "Enter exponent:", 2, -100, 100, 2)
+            exponent, ok = QInputDialog.getDouble(self, "Exponent", "Enter exponent:", 2,
+                                                  -MAX_EXACT_EXPONENT, MAX_EXACT_EXPONENT, 2)
             if not ok:
                 return
+            if exponent.is_integer():
+                exponent = int(exponent)
         
-        base = float(self.current_input)
-        result = math.pow(base, exponent)
-        self.current_input = str(result)
-        self.add_to_history(f"{base}^{exponent}", self.current_input)
-        self.update_display()
+        self.apply_unary("power", f"{{}}^{exponent}", exponent)
     
     def handle_reciprocal(self):
-        value = 1 / float(self.current_input)
-        self.current_input = str(value)
-        self.add_to_history(f"1/({self.current_input})", self.current_input)
+        self.apply_unary("reciprocal", "1/({})")
+    
+    def show_result(self, result):
+        # Results too long for str() are displayed approximately, so the
+        # exact value is kept next to its text for the conversion keys
+        self.current_input = number_to_text(result)
+        self.last_result = (self.current_input, result)
+        return self.current_input
+    
+    def current_value(self):
+        # The exact value behind the display while it still shows the last
+        # result, otherwise the parsed input
+        if self.last_result is not None and self.last_result[0] == self.current_input:
+            return self.engine.coerce(self.last_result[1])
+        return self.engine.number(self.current_input)
+    
+    def handle_base(self, base):
+        # Shows the current value in another base; the input itself stays
+        # decimal, so the next key carries on from the same value
+        try:
+            text = to_base(self.current_value(), base)
+        except CalculationError:
+            self.show_error()
+            return
+        self.history_label.setText(BASE_NAMES[base])
+        self.set_display_text(text)
+    
+    def ask_units(self, title):
+        units, ok = QInputDialog.getText(self, title, "Units (from to):", text=self.last_units)
+        if not ok:
+            return None
+        parts = units.replace("→", " ").split()
+        if len(parts) != 2:
+            QMessageBox.warning(self, title, "Enter two units, for example: km mi")
+            return None
+        self.last_units = " ".join(parts)
+        return parts
+    
+    def handle_unit_conversion(self):
+        units = self.ask_units("Convert Units")
+        if units is None:
+            return
+        source, target = units
+        try:
+            value = self.current_value()
+            result = self.engine.coerce(convert(value, source, target))
+        except CalculationError as exc:
+            QMessageBox.warning(self, "Convert Units", str(exc))
+            return
+        self.show_result(result)
+        if self.expression_mode:
+            self.expression_input = self.current_input
+        self.add_to_history(f"{self.number_format.format(value)} {source} → {target}", result)
+        self.update_display()
+    
+    def convert_history_column(self):
+        # Converts every result in the history in one batch (as floats) and
+        # copies the column to the clipboard, one value per line
+        units = self.ask_units("Convert History Column")
+        if units is None:
+            return
+        source, target = units
+        self.load_history()
+        try:
+            converted = convert_many(self.calculation_history.results_column(), source, target)
+        except CalculationError as exc:
+            QMessageBox.warning(self, "Convert History Column", str(exc))
+            return
+        QApplication.clipboard().setText("\n".join(self.number_format.format(float(value)) for value in converted))
+        self.history_label.setText(f"{len(converted)} results converted to {target} and copied")
+    
+    def apply_unary(self, operation, history_format=None, *args):
+        # `operation` names an engine method taking the current value plus
+        # `args`; slow exact-mode operands are handed to the worker process.
+        try:
+            value = self.engine.number(self.current_input)
+            if self.engine.is_expensive(operation, value, *args):
+                self.run_in_background(operation, (value,) + args,
+                                       partial(self.finish_unary, value, history_format))
+                return
+            result = getattr(self.engine, operation)(value, *args)
+        except CalculationError:
+            self.show_error()
+            return
+        self.finish_unary(value, history_format, result)
+    
+    def finish_unary(self, value, history_format, result):
+        self.show_result(result)
+        if history_format is not None:
+            self.add_to_history(history_format.format(self.number_format.format(value)), result)
         self.update_display()
     
     def calculate_result(self):
         if self.stored_value is None or self.current_operator is None:
-            return
+            return False
         
-        a = self.stored_value
-        b = float(self.current_input)
-        
-        if self.current_operator == '+':
-            result = a + b
-        elif self.current_operator == '-':
-            result = a - b
-        elif self.current_operator == '×':
-            result = a * b
-        elif self.current_operator == '÷':
-            result = a / b if b != 0 else float('nan')
-        
-        self.current_input = str(result)
-        self.stored_value = result
+        with self.instrumentation.measure("calculate_result"):
+            try:
+                b = self.engine.number(self.current_input)
+                result = self.engine.binary(self.current_operator, self.stored_value, b)
+            except CalculationError:
+                self.show_error()
+                return False
+            
+            self.show_result(result)
+            self.stored_value = result
+            self.current_operator = None
+            self.update_display()
+        return True
+    
+    def show_error(self):
+        self.current_input = "0"
+        self.stored_value = None
         self.current_operator = None
-        self.update_display()
+        self.history_label.setText("")
+        self.set_display_text("Error")
     
     def update_display(self):
-        # Format the number to remove trailing .0 if it's an integer
-        try:
-            num = float(self.current_input)
-            if num.is_integer():
-                self.display_label.setText(str(int(num)))
-            else:
-                self.display_label.setText(self.current_input)
-        except ValueError:
-            self.display_label.setText(self.current_input)
+        with self.instrumentation.measure("update_display"):
+            self.set_display_text(None)
+    
+    def set_display_text(self, text):
+        # Repaints are coalesced: the label is written at most once per
+        # frame, with None meaning "format current_input".
+        self.pending_display_text = text
+        if not self.display_timer.isActive():
+            self.display_timer.start()
+    
+    def flush_display(self):
+        with self.instrumentation.measure("flush_display"):
+            self.display_timer.stop()
+            text = self.pending_display_text
+            if text is None:
+                text = self.format_display(self.current_input)
+            self.display_label.setText(text)
+            self.fit_display_font()
+    
+    def format_display(self, text):
+        # Float input is formatted (and cached) by the current NumberFormat.
+        # In exact modes results are formatted from their exact value, and
+        # typed input keeps its digits unless a fixed notation is chosen.
+        number_format = self.number_format
+        if not self.engine.exact:
+            return number_format.format_input(text)
+        if self.last_result is not None and self.last_result[0] == text:
+            return number_format.format(self.last_result[1])
+        if number_format.notation != GENERAL:
+            try:
+                return number_format.format(self.engine.number(text))
+            except CalculationError:
+                return text
+        return group_digits(text) if number_format.grouping else text
+    
+    def fit_display_font(self):
+        # One measurement at the chosen size; the font scales down in
+        # proportion when the text is wider than the label
+        label = self.display_label
+        font = QFont(self.font_family, self.display_font_size, QFont.Weight.Bold)
+        width = QFontMetrics(font).horizontalAdvance(label.text())
+        available = label.contentsRect().width()
+        if available > 0 and width > available:
+            font.setPointSize(max(MIN_DISPLAY_FONT_SIZE, self.display_font_size * available // width))
+        if font.pointSize() != label.font().pointSize():
+            label.setFont(font)
+    
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.fit_display_font()
     
     def keyPressEvent(self, event):
+        if event.matches(QKeySequence.StandardKey.Paste):
+            self.paste_from_clipboard()
+            return
+        if event.matches(QKeySequence.StandardKey.AddTab):
+            self.new_session()
+            return
+        if event.matches(QKeySequence.StandardKey.Close):
+            if self.session_tabs is not None:
+                self.close_session(self.session_tabs.currentIndex())
+            return
+        if event.matches(QKeySequence.StandardKey.NextChild):
+            self.cycle_session()
+            return
         key = event.key()
-        
-        key_mapping = {
-            Qt.Key.Key_0: '0',
-            Qt.Key.Key_1: '1',
-            Qt.Key.Key_2: '2',
-            Qt.Key.Key_3: '3',
-            Qt.Key.Key_4: '4',
-            Qt.Key.Key_5: '5',
-            Qt.Key.Key_6: '6',
-            Qt.Key.Key_7: '7',
-            Qt.Key.Key_8: '8',
-            Qt.Key.Key_9: '9',
-            Qt.Key.Key_Plus: '+',
-            Qt.Key.Key_Minus: '-',
-            Qt.Key.Key_Asterisk: '×',
-            Qt.Key.Key_Slash: '÷',
-            Qt.Key.Key_Period: '.',
-            Qt.Key.Key_Enter: '=',
-            Qt.Key.Key_Return: '=',
-            Qt.Key.Key_Backspace: '⌫',
-            Qt.Key.Key_Escape: 'C',
-            Qt.Key.Key_P: '%',
-            Qt.Key.Key_S: '√'
-        }
-        
-        if key in key_mapping:
-            button_text = key_mapping[key]
-            if button_text in self.buttons:
-                self.buttons[button_text].click()
+        button_text = KEY_MAPPING.get(key)
+        if button_text is not None:
+            if not event.isAutoRepeat():
+                self.animate_button(self.buttons[button_text])
+            self.dispatch(button_text)
+        elif self.expression_mode and event.text() in EXPRESSION_ONLY_CHARACTERS:
+            self.handle_expression_key(event.text())
         elif key == Qt.Key.Key_H:
             self.toggle_history()
+        elif key == Qt.Key.Key_F12:
+            self.toggle_overlay()
+        else:
+            super().keyPressEvent(event)
 
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Modern GUI calculator")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print the time spent in each startup phase")
+    parser.add_argument("--server", metavar="ADDRESS",
+                        help="evaluate expressions on a running server.py (host:port or unix:PATH)")
+    args, qt_args = parser.parse_known_args(argv)
+    
+    profiler = StartupProfiler() if args.profile_startup else NullProfiler()
+    
+    with profiler.phase("QApplication"):
+        app = QApplication([sys.argv[0]] + qt_args)
+        app.setStyle("Fusion")
     
-    app.setStyle("Fusion")
+    client = None
+    if args.server:
+        # Imported here so the asyncio machinery stays off the normal startup path
+        from server import CalculatorClient
+        client = CalculatorClient(args.server)
     
-    calculator = ModernCalculator()
-    calculator.show()
+    calculator = ModernCalculator(profiler=profiler, client=client)
+    with profiler.phase("show"):
+        calculator.show()
     
-    sys.exit(app.exec())
\ No newline at end of file
+    if args.profile_startup:
+        def first_frame():
+            profiler.mark("first frame (total)")
+            profiler.report()
+        QTimer.singleShot(0, first_frame)
+    
+    return app.exec()
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,134 @@
+import argparse
+import csv
+import json
+import math
+import sys
+import time
+
+# Only the engine is imported here so the command line starts without
+# PyQt6 or a display.
+from engine import CalculatorEngine, CalculationError, MODES, FLOAT, number_to_text
+
+OUTPUT_FORMATS = ("csv", "jsonl")
+
+
+def read_expressions(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def json_value(result):
+    # Finite floats stay JSON numbers; exact values keep their full text
+    if type(result) is float and math.isfinite(result):
+        return result
+    return number_to_text(result)
+
+
+def run_batch(engine, stream, output, output_format="csv"):
+    # Evaluates every non-blank line and returns (evaluated, failed). A
+    # failing line gets an error column instead of aborting the batch.
+    expressions = read_expressions(stream)
+    evaluated = failed = 0
+    if output_format == "csv":
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(("expression", "result", "error"))
+        write = writer.writerow
+    else:
+        dumps = json.dumps
+        write_line = output.write
+
+        def write(row):
+            expression, result, error = row
+            if error:
+                write_line(dumps({"expression": expression, "error": error}) + "\n")
+            else:
+                write_line(dumps({"expression": expression, "result": result}) + "\n")
+
+    to_value = number_to_text if output_format == "csv" else json_value
+    evaluate = engine.evaluate
+    for expression in expressions:
+        evaluated += 1
+        try:
+            write((expression, to_value(evaluate(expression)), ""))
+        except CalculationError as exc:
+            failed += 1
+            write((expression, "", str(exc)))
+    return evaluated, failed
+
+
+def run_repl(engine, stream=sys.stdin, output=sys.stdout):
+    # The previous result is available as `ans`
+    interactive = stream.isatty()
+    variables = {}
+    while True:
+        if interactive:
+            output.write("> ")
+            output.flush()
+        line = stream.readline()
+        if not line:
+            break
+        line = line.strip()
+        if line in ("quit", "exit"):
+            break
+        if not line:
+            continue
+        try:
+            result = engine.evaluate(line, variables)
+        except CalculationError as exc:
+            output.write(f"Error: {exc}\n")
+        else:
+            variables["ans"] = result
+            output.write(number_to_text(result) + "\n")
+        output.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate calculator expressions without the GUI")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--batch", nargs="?", const="-", metavar="FILE",
+                        help="evaluate one expression per line of FILE (default: stdin)")
+    action.add_argument("--repl", action="store_true", help="interactive prompt")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv",
+                        help="batch output format (default: csv)")
+    parser.add_argument("--output", default="-", help="batch output file (default: stdout)")
+    parser.add_argument("--mode", choices=MODES, default=FLOAT)
+    parser.add_argument("--precision", type=int, help="significant digits in decimal mode")
+    parser.add_argument("--stats", action="store_true",
+                        help="report expressions per second on stderr")
+    args = parser.parse_args(argv)
+
+    engine = CalculatorEngine(args.mode)
+    if args.precision is not None:
+        try:
+            engine.set_mode(args.mode, args.precision)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+    if args.repl:
+        run_repl(engine)
+        return 0
+
+    source = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+    start = time.perf_counter()
+    try:
+        evaluated, failed = run_batch(engine, source, output, args.format)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+        else:
+            output.flush()
+    elapsed = time.perf_counter() - start
+    if args.stats:
+        rate = evaluated / elapsed if elapsed > 0 else float("inf")
+        print(f"{evaluated} expressions ({failed} failed) in {elapsed:.3f}s, {rate:,.0f} expressions/s",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
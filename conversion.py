@@ -0,0 +1,152 @@
+from array import array
+from decimal import Decimal
+from fractions import Fraction
+
+from engine import CalculationError, number_to_text
+
+# Each unit is value_in_base = value * scale + offset, with exact scales.
+# Unit names are unique across families.
+UNIT_FAMILIES = {
+    "length": {
+        "mm": Fraction(1, 1000), "cm": Fraction(1, 100), "m": 1, "km": 1000,
+        "in": Fraction(254, 10000), "ft": Fraction(3048, 10000), "yd": Fraction(9144, 10000),
+        "mi": Fraction(1609344, 1000), "nmi": 1852,
+    },
+    "mass": {
+        "mg": Fraction(1, 10**6), "g": Fraction(1, 1000), "kg": 1, "t": 1000,
+        "oz": Fraction(28349523125, 10**12), "lb": Fraction(45359237, 10**8),
+        "st": 14 * Fraction(45359237, 10**8),
+    },
+    "time": {
+        "ms": Fraction(1, 1000), "s": 1, "min": 60, "h": 3600, "d": 86400, "wk": 604800,
+    },
+    "volume": {
+        "ml": Fraction(1, 1000), "l": 1, "m3": 1000,
+        "floz": Fraction(295735295625, 10**13), "gal": Fraction(3785411784, 10**9),
+    },
+    "area": {
+        "cm2": Fraction(1, 10**4), "m2": 1, "ha": 10**4, "km2": 10**6,
+        "ft2": Fraction(9290304, 10**8), "acre": Fraction(40468564224, 10**7),
+    },
+    "speed": {
+        "m/s": 1, "km/h": Fraction(1000, 3600), "mph": Fraction(1609344, 3600000),
+        "kn": Fraction(1852, 3600),
+    },
+    "data": {
+        "bit": Fraction(1, 8), "B": 1, "KB": 10**3, "MB": 10**6, "GB": 10**9, "TB": 10**12,
+        "KiB": 2**10, "MiB": 2**20, "GiB": 2**30, "TiB": 2**40,
+    },
+    "temperature": {
+        "K": (1, 0), "C": (1, Fraction(27315, 100)), "F": (Fraction(5, 9), Fraction(45967, 100) * Fraction(5, 9)),
+    },
+}
+
+# Prefix letter of Python's literal for each base
+BASE_CODES = {2: 'b', 8: 'o', 16: 'x'}
+
+
+def build_tables():
+    # unit -> family, and (source, target) -> (factor, shift) for every
+    # pair in a family, once as Fractions and once as floats, so a
+    # conversion is one dict lookup and one multiply-add.
+    units = {}
+    exact = {}
+    for family, members in UNIT_FAMILIES.items():
+        affine = {}
+        for unit, scale in members.items():
+            scale, offset = scale if isinstance(scale, tuple) else (scale, 0)
+            affine[unit] = (Fraction(scale), Fraction(offset))
+            units[unit] = family
+        for source, (source_scale, source_offset) in affine.items():
+            for target, (target_scale, target_offset) in affine.items():
+                exact[source, target] = (source_scale / target_scale,
+                                         (source_offset - target_offset) / target_scale)
+    floats = {pair: (float(factor), float(shift)) for pair, (factor, shift) in exact.items()}
+    # Case-insensitive aliases, kept only where they are unambiguous
+    folded = {}
+    for unit in units:
+        folded.setdefault(unit.lower(), []).append(unit)
+    aliases = {alias: names[0] for alias, names in folded.items() if len(names) == 1}
+    return units, exact, floats, aliases
+
+
+UNITS, EXACT_TABLE, FLOAT_TABLE, UNIT_ALIASES = build_tables()
+
+
+def unit_name(unit):
+    if unit in UNITS:
+        return unit
+    name = UNIT_ALIASES.get(unit.lower())
+    if name is None:
+        raise CalculationError(f"Unknown unit: {unit}")
+    return name
+
+
+def conversion_factors(source, target, exact=False):
+    source, target = unit_name(source), unit_name(target)
+    factors = (EXACT_TABLE if exact else FLOAT_TABLE).get((source, target))
+    if factors is None:
+        raise CalculationError(f"Cannot convert {UNITS[source]} ({source}) to {UNITS[target]} ({target})")
+    return factors
+
+
+def convert(value, source, target):
+    # Floats stay floats; ints, Fractions and Decimals are converted exactly
+    # and come back as Fractions (CalculatorEngine.coerce maps them back to
+    # the current mode).
+    if type(value) is float:
+        factor, shift = conversion_factors(source, target)
+        return value * factor + shift
+    factor, shift = conversion_factors(source, target, exact=True)
+    try:
+        return Fraction(value) * factor + shift
+    except (ValueError, OverflowError):
+        # Decimal NaN and Infinity have no Fraction form
+        raise CalculationError(f"Cannot convert {value}") from None
+
+
+def convert_many(values, source, target):
+    # Batch form for a whole column of results. NumPy arrays (and arrays of
+    # doubles when NumPy is installed) are converted in one vector pass;
+    # other iterables give a list. NumPy is imported here rather than at
+    # module level, so the calculator's conversion keys keep it off startup.
+    factor, shift = conversion_factors(source, target)
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    if np is not None:
+        if isinstance(values, array) and values.typecode == 'd':
+            values = np.frombuffer(values, dtype=np.float64)
+        if isinstance(values, np.ndarray):
+            return values * factor + shift
+    if isinstance(values, array):
+        return array('d', [value * factor + shift for value in values])
+    return [value * factor + shift if type(value) is float else convert(value, source, target)
+            for value in values]
+
+
+def whole_number(value):
+    if type(value) is int:
+        return value
+    if type(value) is float and value.is_integer():
+        return int(value)
+    if type(value) is Fraction and value.denominator == 1:
+        return value.numerator
+    if type(value) is Decimal and value.is_finite() and value == value.to_integral_value():
+        return int(value)
+    raise CalculationError("Base conversion needs a whole number")
+
+
+def to_base(value, base):
+    # Power-of-two bases are converted by the builtins in linear time and
+    # are not subject to the int string-length limit
+    value = whole_number(value)
+    if base == 10:
+        return number_to_text(value)
+    code = BASE_CODES.get(base)
+    if code is None:
+        raise CalculationError(f"Unsupported base: {base}")
+    sign = '-' if value < 0 else ''
+    return f"{sign}0{code}{abs(value):{code}}"
+
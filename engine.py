@@ -0,0 +1,473 @@
+import decimal
+import math
+import re
+from fractions import Fraction
+from functools import lru_cache
+
+from expression import compile_expression, ExpressionError, EXPRESSION_CACHE_SIZE
+from memo import MemoCache, MISSING, DEFAULT_MEMO_SIZE
+
+
+class CalculationError(ValueError):
+    pass
+
+
+FLOAT = "float"
+DECIMAL = "decimal"
+FRACTION = "fraction"
+MODES = (FLOAT, DECIMAL, FRACTION)
+
+DEFAULT_PRECISION = 28
+
+# Exact integer and rational powers grow without bound, so very large
+# exponents, and expressions estimated to need more bits than this (such
+# as a run of chained squares), are refused instead of tying up the caller.
+MAX_EXACT_EXPONENT = 100000
+MAX_EXACT_BITS = 2 ** 24
+
+# Beyond these sizes an exact-mode operation may take long enough to stall
+# a GUI, so callers are told to run it in the background (is_expensive).
+EXPENSIVE_EXPONENT = 1000
+EXPENSIVE_BITS = 100000
+EXPENSIVE_PRECISION = 2000
+LOG2_10 = math.log2(10)
+
+BINARY_OPERATORS = ('+', '-', '×', '÷')
+
+INTEGER_PATTERN = re.compile(r"[-+]?\d+")
+
+
+class CalculatorEngine:
+    # Numbers are native floats in "float" mode. The exact modes keep integer
+    # operands as Python ints for as long as the result is guaranteed exact
+    # and only promote to Decimal or Fraction when they have to.
+    def __init__(self, mode=FLOAT, precision=DEFAULT_PRECISION, memo_size=DEFAULT_MEMO_SIZE):
+        self.precision = precision
+        # Results of the scientific operations (exact modes) and of whole
+        # expressions. Keys carry the mode and precision, so switching modes
+        # never serves a stale value.
+        self.memo = MemoCache(memo_size)
+        self.set_mode(mode, precision)
+
+    def set_mode(self, mode, precision=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown numeric mode: {mode!r}")
+        if precision is not None:
+            if precision < 1:
+                raise ValueError("Precision must be at least 1")
+            self.precision = precision
+        self.mode = mode
+        self.exact = mode != FLOAT
+        self.context = decimal.Context(prec=self.precision,
+                                       traps=[decimal.InvalidOperation, decimal.DivisionByZero,
+                                              decimal.Overflow])
+
+    def number(self, text):
+        if not isinstance(text, str):
+            return self.coerce(text)
+        try:
+            if not self.exact:
+                if '/' in text:
+                    return float(Fraction(text))
+                return float(text)
+            if INTEGER_PATTERN.fullmatch(text):
+                return int(text)
+            if '/' in text:
+                return self.coerce(Fraction(text))
+            if self.mode == DECIMAL:
+                value = decimal.Decimal(text)
+                if not value.is_finite():
+                    raise CalculationError(f"Invalid number: {text!r}")
+                return value
+            return self._normalize(Fraction(text))
+        except (TypeError, ValueError, ZeroDivisionError, decimal.InvalidOperation):
+            raise CalculationError(f"Invalid number: {text!r}") from None
+
+    def coerce(self, value):
+        # Converts a value produced under another mode into this mode
+        try:
+            if not self.exact:
+                return float(value)
+            if type(value) is int:
+                return value
+            if self.mode == DECIMAL:
+                return self._to_decimal(value)
+            return self._normalize(self._to_fraction(value))
+        except (ValueError, OverflowError, decimal.DecimalException) as exc:
+            raise CalculationError(f"Cannot represent {value!r} in {self.mode} mode: {exc}") from None
+
+    def binary(self, op, a, b):
+        if not self.exact:
+            if op == '+':
+                return a + b
+            elif op == '-':
+                return a - b
+            elif op == '×':
+                return a * b
+            elif op == '÷':
+                return a / b if b != 0 else float('nan')
+            raise CalculationError(f"Unknown operator: {op!r}")
+
+        if type(a) is int and type(b) is int:
+            if op == '+':
+                return a + b
+            elif op == '-':
+                return a - b
+            elif op == '×':
+                return a * b
+            elif op == '÷' and b != 0 and a % b == 0:
+                return a // b
+        if op == '÷' and b == 0:
+            return float('nan')
+        if op not in BINARY_OPERATORS:
+            raise CalculationError(f"Unknown operator: {op!r}")
+
+        try:
+            if self.mode == DECIMAL:
+                a, b = self._to_decimal(a), self._to_decimal(b)
+                context = self.context
+                if op == '+':
+                    return context.add(a, b)
+                elif op == '-':
+                    return context.subtract(a, b)
+                elif op == '×':
+                    return context.multiply(a, b)
+                return context.divide(a, b)
+
+            a, b = self._to_fraction(a), self._to_fraction(b)
+            if op == '+':
+                result = a + b
+            elif op == '-':
+                result = a - b
+            elif op == '×':
+                result = a * b
+            else:
+                result = a / b
+            return self._normalize(result)
+        except (ValueError, decimal.DecimalException) as exc:
+            raise CalculationError(f"Cannot compute {a} {op} {b}: {exc}") from None
+
+    def square_root(self, value):
+        if type(value) is decimal.Decimal and value.is_nan():
+            raise CalculationError("Square root of NaN")
+        if value < 0:
+            raise CalculationError("Square root of a negative number")
+        if not self.exact:
+            return math.sqrt(value)
+        return self.memoized("square_root", self._exact_square_root, value)
+
+    def _exact_square_root(self, value):
+        try:
+            if type(value) is int or type(value) is Fraction:
+                fraction = Fraction(value)
+                numerator = math.isqrt(fraction.numerator)
+                denominator = math.isqrt(fraction.denominator)
+                if (numerator * numerator == fraction.numerator
+                        and denominator * denominator == fraction.denominator):
+                    return self._normalize(Fraction(numerator, denominator))
+            root = self.context.sqrt(self._to_decimal(value))
+            return root if self.mode == DECIMAL else self._normalize(Fraction(root))
+        except (ValueError, decimal.DecimalException) as exc:
+            raise CalculationError(f"Cannot take the square root of {value}: {exc}") from None
+
+    def power(self, base, exponent):
+        if not self.exact:
+            try:
+                return math.pow(base, exponent)
+            except (OverflowError, ValueError) as exc:
+                raise CalculationError(f"Cannot raise {base} to {exponent}: {exc}") from None
+        return self.memoized("power", self._exact_power, base, exponent)
+
+    def _exact_power(self, base, exponent):
+        try:
+            # Checked before the Decimal path too, where it gives Infinity
+            if base == 0 and exponent < 0:
+                raise CalculationError("Zero cannot be raised to a negative power")
+            if exponent == int(exponent) and type(base) is not decimal.Decimal:
+                exponent = int(exponent)
+                if abs(exponent) > MAX_EXACT_EXPONENT:
+                    raise CalculationError(f"Exponent {exponent} is too large for exact arithmetic")
+                if type(base) is int and exponent >= 0:
+                    return base ** exponent
+                if self.mode == FRACTION:
+                    return self._normalize(self._to_fraction(base) ** exponent)
+            result = self.context.power(self._to_decimal(base), self._to_decimal(exponent))
+            return result if self.mode == DECIMAL else self._normalize(Fraction(result))
+        except CalculationError:
+            raise
+        except (ValueError, OverflowError, decimal.DecimalException) as exc:
+            raise CalculationError(f"Cannot raise {base} to {exponent}: {exc}") from None
+
+    def reciprocal(self, value):
+        if value == 0:
+            raise CalculationError("Reciprocal of zero")
+        if not self.exact:
+            return 1 / value
+        return self.memoized("reciprocal", self._exact_reciprocal, value)
+
+    def _exact_reciprocal(self, value):
+        return self.binary('÷', 1, value)
+
+    def percent(self, value):
+        if not self.exact:
+            return value / 100
+        return self.binary('÷', value, 100)
+
+    def is_expensive(self, operation, *operands):
+        if not self.exact:
+            return False
+        if self.mode == DECIMAL and self.precision >= EXPENSIVE_PRECISION:
+            return True
+        if operation == "evaluate":
+            return estimate_bits(operands[0], self.mode, self.precision) > EXPENSIVE_BITS
+        if operation == "power" and abs(operands[1]) > EXPENSIVE_EXPONENT:
+            return True
+        return any(value_bits(operand) > EXPENSIVE_BITS for operand in operands)
+
+    def memo_key(self, operation, operands):
+        # Equal numbers of different types (1, 1.0, Fraction(1), Decimal(1))
+        # and Decimals differing only in exponent give different results, so
+        # the key holds each operand's type and, for Decimals, its digits.
+        key = [self.mode, self.precision, operation]
+        for operand in operands:
+            if type(operand) is decimal.Decimal:
+                operand = operand.as_tuple()
+            key.append(type(operand))
+            key.append(operand)
+        return tuple(key)
+
+    def memoized(self, operation, function, *operands):
+        # Failures raise before anything is stored, and neither expensive
+        # operations nor results too big to be worth pinning in memory
+        # (past EXPENSIVE_BITS) are cached.
+        if self.is_expensive(operation, *operands):
+            return function(*operands)
+        key = self.memo_key(operation, operands)
+        result = self.memo.get(key)
+        if result is MISSING:
+            result = function(*operands)
+            if value_bits(result) <= EXPENSIVE_BITS:
+                self.memo.put(key, result)
+        return result
+
+    def _to_decimal(self, value):
+        if type(value) is Fraction:
+            return self.context.divide(decimal.Decimal(value.numerator), decimal.Decimal(value.denominator))
+        if type(value) is float:
+            return decimal.Decimal(repr(value))
+        return decimal.Decimal(value)
+
+    def _to_fraction(self, value):
+        if type(value) is float:
+            return Fraction(repr(value))
+        return Fraction(value)
+
+    def _normalize(self, value):
+        if value.denominator == 1:
+            return value.numerator
+        return value
+
+    def evaluate(self, expression, variables=None):
+        # Operators follow the usual precedence: postfix ² and %, then ^
+        # (right associative), unary - and √, × and ÷, and finally + and -.
+        if variables:
+            return self._evaluate(expression, variables)
+        # The source text alone identifies an expression without variables.
+        # Only small results of cheap expressions are stored, so a hit needs
+        # no size estimate.
+        key = (self.mode, self.precision, expression)
+        result = self.memo.get(key)
+        if result is MISSING:
+            if self.is_expensive("evaluate", expression):
+                if estimate_bits(expression, self.mode, self.precision) > MAX_EXACT_BITS:
+                    raise CalculationError(f"{expression} is too large for exact arithmetic")
+                return self._evaluate(expression)
+            result = self._evaluate(expression)
+            if value_bits(result) <= EXPENSIVE_BITS:
+                self.memo.put(key, result)
+        return result
+
+    def _evaluate(self, expression, variables=None):
+        try:
+            compiled = compile_expression(expression)
+            if variables:
+                variables = {name: self.coerce(value) for name, value in variables.items()}
+            return compiled.root(self, variables)
+        except ExpressionError as exc:
+            raise CalculationError(str(exc)) from None
+
+    def evaluate_many(self, expressions):
+        # Errors are yielded in place of the result so that one bad line
+        # does not abort a whole batch.
+        evaluate = self.evaluate
+        for expression in expressions:
+            try:
+                yield evaluate(expression)
+            except CalculationError as exc:
+                yield exc
+
+
+def value_bits(value):
+    # Size of an exact value; floats and Decimals are bounded and count as 0
+    if type(value) is int:
+        return value.bit_length()
+    if type(value) is Fraction:
+        return value.numerator.bit_length() + value.denominator.bit_length()
+    return 0
+
+
+class SizeEstimate:
+    # Stand-in for a number while sizing an expression: an estimate of the
+    # exact value's size in bits, a float approximation of the value and
+    # whether it may be a Python int
+    __slots__ = ("bits", "value", "integral")
+
+    def __init__(self, bits, value, integral):
+        self.bits = bits
+        self.value = value
+        self.integral = integral
+
+    def __neg__(self):
+        return SizeEstimate(self.bits, -self.value, self.integral)
+
+
+class SizeEstimator:
+    # Runs a compiled expression over SizeEstimates in place of an engine,
+    # keeping the largest size seen. Results that go through a Decimal
+    # context (in Decimal mode, everything but ints) are bounded by the
+    # precision; exact integer powers multiply the size of their base.
+    def __init__(self, mode, precision):
+        self.mode = mode
+        self.rounded_bits = 2 * LOG2_10 * precision
+        self.peak = 0
+
+    def size(self, bits, value, integral):
+        if self.mode == DECIMAL and not integral:
+            bits = min(bits, self.rounded_bits)
+        if bits > self.peak:
+            self.peak = bits
+        return SizeEstimate(bits, value, integral)
+
+    def number(self, text):
+        value = float(text)
+        whole = value.is_integer() and value != 0
+        if INTEGER_PATTERN.fullmatch(text):
+            return self.size(max(math.log2(value), 1) if whole else len(text) * LOG2_10, value, True)
+        # Other literals are sized by their digits: 1e-5000 is 1/10^5000.
+        # In Decimal mode they are Decimals, whatever their value.
+        mantissa, _, exponent = text.lower().partition('e')
+        scale = math.inf if len(exponent) > 7 else abs(int(exponent or 0))
+        bits = LOG2_10 * (len(mantissa) + scale)
+        if whole:
+            bits = min(bits, max(math.log2(abs(value)), 1))
+        return self.size(bits, value, whole and self.mode != DECIMAL)
+
+    def binary(self, op, a, b):
+        integral = a.integral and b.integral
+        if op in ('+', '-'):
+            bits = max(a.bits, b.bits) + 1 if integral else a.bits + b.bits
+            value = a.value + b.value if op == '+' else a.value - b.value
+        elif op == '×':
+            bits, value = a.bits + b.bits, a.value * b.value
+        else:
+            value = a.value / b.value if b.value else math.nan
+            bits, integral = a.bits + b.bits, integral and value.is_integer()
+        return self.size(bits, value, integral)
+
+    def power(self, base, exponent):
+        if type(exponent) is SizeEstimate:
+            exponent = exponent.value
+        else:
+            # ² passes a plain 2
+            exponent = float(exponent)
+        integral = base.integral and exponent >= 0
+        if exponent.is_integer() and abs(exponent) <= MAX_EXACT_EXPONENT:
+            bits = base.bits * max(abs(exponent), 1)
+        else:
+            bits, integral = self.rounded_bits, False
+        try:
+            value = math.pow(base.value, exponent)
+        except OverflowError:
+            value = math.inf
+        except ValueError:
+            value = math.nan
+        return self.size(bits, value, integral)
+
+    def square_root(self, value):
+        return self.size(max(value.bits / 2, self.rounded_bits), math.sqrt(abs(value.value)), value.integral)
+
+    def percent(self, value):
+        return self.binary('÷', value, SizeEstimate(7, 100.0, True))
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def estimate_bits(expression, mode, precision):
+    # Largest intermediate result of an exact-mode expression, in bits.
+    # Sizing the compiled tree catches what no look at the text can, such
+    # as chained squares or exponents like 1e5. Expressions that fail to
+    # compile or use variables are left for evaluate() to report.
+    estimator = SizeEstimator(mode, precision)
+    try:
+        compile_expression(expression).root(estimator, None)
+    except ExpressionError:
+        return 0
+    return estimator.peak
+
+
+def approximate_decimal(value, precision=DEFAULT_PRECISION):
+    # Decimal of an int or Fraction of any size, to `precision` digits.
+    # Decimal(int) is quadratic in the number of digits, so big ints go in
+    # as their leading 128 bits times a power of two.
+    context = decimal.Context(prec=precision + 10, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+
+    def leading(number):
+        shift = max(abs(number).bit_length() - 128, 0)
+        if not shift:
+            return decimal.Decimal(number)
+        result = context.multiply(decimal.Decimal(abs(number) >> shift), context.power(2, shift))
+        return -result if number < 0 else result
+
+    if type(value) is Fraction:
+        value = context.divide(leading(value.numerator), leading(value.denominator))
+    else:
+        value = leading(value)
+    context.prec = precision
+    return context.plus(value)
+
+
+def number_to_text(value):
+    # str() refuses ints (and Fractions built from them) longer than
+    # sys.get_int_max_str_digits(); those are written in scientific notation.
+    try:
+        return str(value)
+    except ValueError:
+        return f"{approximate_decimal(value):.{DEFAULT_PRECISION - 1}e}"
+
+
+def serve_jobs(connection):
+    # Entry point of the background worker process (see workers.py). Jobs
+    # arrive as (job id, mode, precision, engine method, arguments).
+    engines = {}
+    while True:
+        try:
+            job_id, mode, precision, operation, args = connection.recv()
+        except (EOFError, OSError):
+            return
+        engine = engines.get((mode, precision))
+        if engine is None:
+            engine = engines[mode, precision] = CalculatorEngine(mode, precision)
+        try:
+            connection.send((job_id, getattr(engine, operation)(*args), None))
+        except CalculationError as exc:
+            connection.send((job_id, None, str(exc)))
+
+
+default_engine = CalculatorEngine()
+
+
+def evaluate(expression, variables=None):
+    return default_engine.evaluate(expression, variables)
+
+
+def evaluate_many(expressions):
+    return default_engine.evaluate_many(expressions)
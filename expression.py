@@ -0,0 +1,227 @@
+import re
+from functools import lru_cache
+
+EXPRESSION_CACHE_SIZE = 4096
+
+# ASCII spellings accepted alongside the keypad symbols
+OPERATOR_ALIASES = {'*': '×', '/': '÷', '**': '^', 'ⁿ': '^'}
+
+TOKEN_PATTERN = re.compile(
+    r"\s*(?:(\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)|([A-Za-z_][A-Za-z0-9_]*)|(\*\*|\S))")
+
+NUMBER, NAME, OPERATOR = "number", "name", "operator"
+
+# Left binding powers for infix and postfix operators
+BINDING_POWER = {
+    '+': 10, '-': 10,
+    '×': 20, '÷': 20,
+    '^': 40,
+    '²': 50, '%': 50,
+}
+CHAIN_OPERATORS = frozenset(['+', '-', '×', '÷'])
+PREFIX_POWER = 30
+IMPLICIT_MULTIPLY_POWER = 20
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+def tokenize(source):
+    tokens = []
+    for number, name, symbol in TOKEN_PATTERN.findall(source):
+        if number:
+            tokens.append((NUMBER, number))
+        elif name:
+            tokens.append((NAME, name))
+        elif symbol:
+            tokens.append((OPERATOR, OPERATOR_ALIASES.get(symbol, symbol)))
+    return tokens
+
+
+# Every node of the compiled tree is a closure called as node(ops, env):
+# `ops` supplies the arithmetic (a CalculatorEngine or anything with the
+# same methods) and `env` maps variable names to values.
+
+def _literal(text):
+    def node(ops, env):
+        return ops.number(text)
+    return node
+
+
+def _variable(name):
+    def node(ops, env):
+        try:
+            return env[name]
+        except (KeyError, TypeError):
+            raise ExpressionError(f"Unknown variable: {name!r}") from None
+    return node
+
+
+def _binary(op, left, right):
+    def node(ops, env):
+        return ops.binary(op, left(ops, env), right(ops, env))
+    return node
+
+
+def _chain(first, rest):
+    # Left-associative run such as a + b - c + d, evaluated in a loop so
+    # long sums do not turn into deeply nested calls.
+    if len(rest) == 1:
+        return _binary(rest[0][0], first, rest[0][1])
+    rest = tuple(rest)
+
+    def node(ops, env):
+        binary = ops.binary
+        value = first(ops, env)
+        for op, operand in rest:
+            value = binary(op, value, operand(ops, env))
+        return value
+    return node
+
+
+def _negate(operand):
+    def node(ops, env):
+        return -operand(ops, env)
+    return node
+
+
+def _square_root(operand):
+    def node(ops, env):
+        return ops.square_root(operand(ops, env))
+    return node
+
+
+def _power(base, exponent):
+    def node(ops, env):
+        return ops.power(base(ops, env), exponent(ops, env))
+    return node
+
+
+def _square(operand):
+    def node(ops, env):
+        return ops.power(operand(ops, env), 2)
+    return node
+
+
+def _percent(operand):
+    def node(ops, env):
+        return ops.percent(operand(ops, env))
+    return node
+
+
+class _Parser:
+    # Pratt parser producing the closure tree directly. Juxtaposition such
+    # as "3x" or "2(1 + 4)" is read as multiplication.
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        self.variables = set()
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None
+
+    def advance(self):
+        token = self.peek()
+        if token is None:
+            raise ExpressionError("Unexpected end of expression")
+        self.pos += 1
+        return token
+
+    def parse(self, right_power=0):
+        left = self.prefix(self.advance())
+        chain = []
+        chain_power = None
+        while True:
+            token = self.peek()
+            if token is None:
+                break
+            kind, value = token
+            implicit = False
+            if kind == OPERATOR and value in BINDING_POWER:
+                power = BINDING_POWER[value]
+            elif kind == NAME or value in ('(', '√'):
+                power = IMPLICIT_MULTIPLY_POWER
+                value = '×'
+                implicit = True
+            else:
+                break
+            if power <= right_power:
+                break
+            if value in CHAIN_OPERATORS:
+                if not implicit:
+                    self.pos += 1
+                if chain and power != chain_power:
+                    left = _chain(left, chain)
+                    chain = []
+                chain_power = power
+                chain.append((value, self.parse(power)))
+                continue
+            if chain:
+                left = _chain(left, chain)
+                chain = []
+            left = self.postfix(left, value, power)
+        if chain:
+            left = _chain(left, chain)
+        return left
+
+    def prefix(self, token):
+        kind, value = token
+        if kind == NUMBER:
+            return _literal(value)
+        if kind == NAME:
+            self.variables.add(value)
+            return _variable(value)
+        if value == '(':
+            inner = self.parse()
+            if self.advance() != (OPERATOR, ')'):
+                raise ExpressionError("Missing closing parenthesis")
+            return inner
+        if value == '-':
+            return _negate(self.parse(PREFIX_POWER))
+        if value == '+':
+            return self.parse(PREFIX_POWER)
+        if value == '√':
+            return _square_root(self.parse(PREFIX_POWER))
+        raise ExpressionError(f"Unexpected token: {value!r}")
+
+    def postfix(self, left, value, power):
+        self.pos += 1
+        if value == '²':
+            return _square(left)
+        if value == '%':
+            return _percent(left)
+        # Right associative: 2^3^2 is 2^(3^2)
+        return _power(left, self.parse(power - 1))
+
+
+class CompiledExpression:
+    __slots__ = ('source', 'root', 'variables')
+
+    def __init__(self, source, root, variables):
+        self.source = source
+        self.root = root
+        self.variables = variables
+
+    def __call__(self, ops, env=None):
+        return self.root(ops, env)
+
+    def __repr__(self):
+        return f"CompiledExpression({self.source!r})"
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def compile_expression(source):
+    tokens = tokenize(source)
+    if not tokens:
+        raise ExpressionError("Empty expression")
+    parser = _Parser(tokens)
+    try:
+        root = parser.parse()
+    except RecursionError:
+        raise ExpressionError("Expression is nested too deeply") from None
+    if parser.pos != len(tokens):
+        raise ExpressionError(f"Unexpected token: {tokens[parser.pos][1]!r}")
+    return CompiledExpression(source, root, frozenset(parser.variables))
@@ -0,0 +1,116 @@
+import decimal
+import math
+from decimal import Decimal
+from functools import lru_cache
+
+from engine import approximate_decimal, number_to_text
+
+GENERAL = "general"
+SCIENTIFIC = "scientific"
+ENGINEERING = "engineering"
+NOTATIONS = (GENERAL, SCIENTIFIC, ENGINEERING)
+
+# Floats carry 15-17 significant digits; showing 15 hides representation
+# noise such as 5.000000000000001 or 0.30000000000000004.
+DEFAULT_DIGITS = 15
+MAX_DIGITS = 17
+FORMAT_CACHE_SIZE = 4096
+
+
+def trim_mantissa(mantissa):
+    if '.' in mantissa:
+        mantissa = mantissa.rstrip('0').rstrip('.')
+    return mantissa
+
+
+def group_digits(text):
+    # Inserts thousands separators into the integer part of a plain number
+    sign = '-' if text.startswith('-') else ''
+    body = text[len(sign):]
+    whole, point, rest = body.partition('.')
+    if not whole.isdigit() or len(whole) <= 3:
+        return text
+    return f"{sign}{int(whole):,}{point}{rest}"
+
+
+def scientific_parts(value, digits):
+    # (mantissa, exponent) rounded to `digits` significant digits
+    if type(value) is float:
+        text = f"{value:.{digits - 1}e}"
+    elif type(value) is Decimal:
+        text = f"{decimal.Context(prec=digits).plus(value):.{digits - 1}e}"
+    else:
+        text = f"{approximate_decimal(value, digits):.{digits - 1}e}"
+    mantissa, _, exponent = text.partition('e')
+    return mantissa, int(exponent)
+
+
+def format_exponent(value, digits, notation):
+    mantissa, exponent = scientific_parts(value, digits)
+    if notation == ENGINEERING:
+        # Exponents in multiples of three; the shift is exact in Decimal
+        shift = exponent % 3
+        mantissa = f"{Decimal(mantissa).scaleb(shift):f}"
+        exponent -= shift
+    return f"{trim_mantissa(mantissa)}e{exponent:+03d}"
+
+
+def render(value, digits, notation, grouping):
+    if type(value) is float and not math.isfinite(value) or type(value) is Decimal and not value.is_finite():
+        return str(value)
+    if notation != GENERAL and value:
+        return format_exponent(value, digits, notation)
+    if type(value) is float:
+        return format(value, f"{',' if grouping else ''}.{digits}g")
+    # Exact values keep every digit in general notation
+    text = number_to_text(value)
+    return group_digits(text) if grouping else text
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE, typed=True)
+def cached_render(value, digits, notation, grouping):
+    return render(value, digits, notation, grouping)
+
+
+def format_number(value, digits=DEFAULT_DIGITS, notation=GENERAL, grouping=False):
+    # Decimals that compare equal can print differently (1.0 and 1.00), as
+    # can 0.0 and -0.0, which also share a cache key; those are rendered
+    # uncached and everything else is cached per value and format.
+    if type(value) is Decimal or not value:
+        return render(value, digits, notation, grouping)
+    return cached_render(value, digits, notation, grouping)
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def format_input(text, digits=DEFAULT_DIGITS, notation=GENERAL, grouping=False):
+    # Display form of the float-mode input text. Whole numbers and results
+    # with more digits than shown are formatted as numbers; anything else
+    # is still being typed ("1.50") and keeps its digits.
+    try:
+        value = float(text)
+    except ValueError:
+        return text
+    if (notation == GENERAL and not value.is_integer() and 'e' not in text
+            and len(text.replace('.', '').lstrip('-0')) <= digits):
+        return group_digits(text) if grouping else text
+    return format_number(value, digits, notation, grouping)
+
+
+class NumberFormat:
+    # Display settings shared by the main display and the history view
+    __slots__ = ("digits", "notation", "grouping")
+
+    def __init__(self, digits=DEFAULT_DIGITS, notation=GENERAL, grouping=False):
+        if not 1 <= digits <= MAX_DIGITS:
+            raise ValueError(f"Digits must be between 1 and {MAX_DIGITS}")
+        if notation not in NOTATIONS:
+            raise ValueError(f"Unknown notation: {notation}")
+        self.digits = digits
+        self.notation = notation
+        self.grouping = grouping
+
+    def format(self, value):
+        return format_number(value, self.digits, self.notation, self.grouping)
+
+    def format_input(self, text):
+        return format_input(text, self.digits, self.notation, self.grouping)
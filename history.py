@@ -0,0 +1,132 @@
+import math
+import sys
+from array import array
+
+DEFAULT_HISTORY_CAPACITY = 10000
+
+
+def approximate(value):
+    try:
+        return float(value)
+    except OverflowError:
+        return math.inf if value > 0 else -math.inf
+
+
+class HistoryEntry:
+    __slots__ = ('expression', 'result')
+
+    def __init__(self, expression, result):
+        self.expression = expression
+        self.result = result
+
+    def __iter__(self):
+        yield self.expression
+        yield self.result
+
+    def __repr__(self):
+        return f"HistoryEntry({self.expression!r}, {self.result!r})"
+
+
+class HistoryStore:
+    # Fixed-capacity ring buffer. Expressions live in a preallocated list and
+    # results in a parallel array of C doubles, so appending and evicting the
+    # oldest entry are both O(1) and no per-entry objects are kept around.
+    # Results that are not floats (ints, Decimals and Fractions from the
+    # exact modes) are kept as-is in a sparse side table next to their float
+    # approximation.
+    def __init__(self, capacity=DEFAULT_HISTORY_CAPACITY):
+        if capacity < 1:
+            raise ValueError("History capacity must be at least 1")
+        self.capacity = capacity
+        self._expressions = [None] * capacity
+        self._results = array('d', bytes(8 * capacity))
+        self._exact = {}
+        self._start = 0
+        self._size = 0
+        self._expression_bytes = 0
+        self.total_appended = 0
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self[i]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("history index out of range")
+        slot = (self._start + index) % self.capacity
+        return HistoryEntry(self._expressions[slot], self._result(slot))
+
+    def append(self, expression, result):
+        # Returns True when the oldest entry was evicted to make room.
+        evicted = self._size == self.capacity
+        if evicted:
+            self.evict_oldest()
+        slot = (self._start + self._size) % self.capacity
+        self._size += 1
+        self._expressions[slot] = expression
+        if type(result) is float:
+            self._results[slot] = result
+        else:
+            self._results[slot] = approximate(result)
+            self._exact[slot] = result
+        self._expression_bytes += sys.getsizeof(expression)
+        self.total_appended += 1
+        return evicted
+
+    def evict_oldest(self):
+        if not self._size:
+            raise IndexError("evict from empty history")
+        slot = self._start
+        entry = HistoryEntry(self._expressions[slot], self._result(slot))
+        self._expression_bytes -= sys.getsizeof(entry.expression)
+        self._expressions[slot] = None
+        self._exact.pop(slot, None)
+        self._start = (self._start + 1) % self.capacity
+        self._size -= 1
+        return entry
+
+    def _result(self, slot):
+        if self._exact:
+            exact = self._exact.get(slot)
+            if exact is not None:
+                return exact
+        return self._results[slot]
+
+    def first_sequence(self):
+        # Every append gets the next sequence number (total_appended before
+        # the append); the oldest live entry has this one.
+        return self.total_appended - self._size
+
+    def approximate_result(self, index):
+        return self._results[(self._start + index) % self.capacity]
+
+    def results_column(self):
+        # Float approximations of every result, oldest first, as one array
+        end = self._start + self._size
+        if end <= self.capacity:
+            return self._results[self._start:end]
+        return self._results[self._start:] + self._results[:end - self.capacity]
+
+    def latest(self, count):
+        count = min(count, self._size)
+        return [self[i] for i in range(self._size - 1, self._size - 1 - count, -1)]
+
+    def clear(self):
+        self._expressions = [None] * self.capacity
+        self._exact = {}
+        self._start = 0
+        self._size = 0
+        self._expression_bytes = 0
+
+    def memory_usage(self):
+        return (sys.getsizeof(self)
+                + sys.getsizeof(self._expressions)
+                + sys.getsizeof(self._results)
+                + sys.getsizeof(self._exact)
+                + sum(sys.getsizeof(value) for value in self._exact.values())
+                + self._expression_bytes)
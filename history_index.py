@@ -0,0 +1,242 @@
+import heapq
+import math
+import re
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+
+from engine import number_to_text
+
+MAX_RESULTS = 1000
+CHUNK_SIZE = 1024
+# Words are indexed under each of their prefixes up to this length; longer
+# query prefixes are answered from the PREFIX_LENGTH posting and verified.
+PREFIX_LENGTH = 4
+# Result values are bucketed 16 ways per power of two
+BUCKETS_PER_OCTAVE = 16
+BUCKET_OFFSET = 20000
+
+# Indexed words: numbers (with their decimal point) and names. Operators are
+# not searchable on their own.
+WORD_PATTERN = re.compile(r"[0-9A-Za-z_.]+")
+NUMBER = r"-?(?:\d+\.?\d*|\.\d+)(?:e[-+]?\d+)?"
+RANGE_PATTERN = re.compile(rf"(?P<low>{NUMBER})\s*\.\.\s*(?P<high>{NUMBER})"
+                           rf"|(?P<op>>=|<=|>|<|=)\s*(?P<value>{NUMBER})")
+
+
+def entry_words(expression, result):
+    return set(WORD_PATTERN.findall(f"{expression} {number_to_text(result)}".lower()))
+
+
+def value_bucket(value):
+    # Monotonic in value: a range of values maps to a range of buckets
+    if value == 0 or math.isnan(value):
+        return 0
+    if math.isinf(value):
+        key = 2 * BUCKET_OFFSET
+    else:
+        mantissa, exponent = math.frexp(abs(value))
+        key = exponent * BUCKETS_PER_OCTAVE + int((mantissa - 0.5) * 2 * BUCKETS_PER_OCTAVE) + BUCKET_OFFSET
+    return key if value > 0 else -key
+
+
+def newest_chunks(sequences, first_live):
+    # Walks a posting list (ascending sequence numbers) backwards, a slice
+    # at a time
+    start = bisect_left(sequences, first_live)
+    stop = len(sequences)
+    while stop > start:
+        chunk = sequences[max(start, stop - CHUNK_SIZE):stop].tolist()
+        chunk.reverse()
+        yield chunk
+        stop -= CHUNK_SIZE
+
+
+def newest_in_range(sequences, values, low, high, first_live):
+    for i in range(len(sequences) - 1, -1, -1):
+        sequence = sequences[i]
+        if sequence < first_live:
+            return
+        if low <= values[i] <= high:
+            yield sequence
+
+
+class HistoryIndex:
+    # Incremental search index over a HistoryStore. Entries are identified
+    # by their sequence number (see HistoryStore.first_sequence), so every
+    # posting list is append-only and sorted, evicted entries are skipped by
+    # position, and a search reads the newest matches first and stops at
+    # the limit. Call sync() after appending to the store; it only indexes
+    # the new entries, and can be limited to a slice of them at a time.
+    #
+    # Queries combine, with AND:
+    #   words               prefixes of numbers or names in the expression or result
+    #   a..b                results between a and b (inclusive)
+    #   >x >=x <x <=x =x    result comparisons
+    def __init__(self, store):
+        self.store = store
+        self.prefixes = {}
+        self.buckets = {}
+        self.bucket_keys = []
+        self.next_sequence = 0
+        self.trimmed_at = 0
+        self.sync()
+
+    def clear(self):
+        self.prefixes = {}
+        self.buckets = {}
+        self.bucket_keys = []
+        self.next_sequence = self.trimmed_at = self.store.total_appended
+
+    def sync(self, limit=None):
+        # Indexes up to `limit` of the entries appended since the last call
+        # (all of them by default); returns True once the index is caught up
+        store = self.store
+        first_live = store.first_sequence()
+        end = store.total_appended
+        start = max(self.next_sequence, first_live)
+        if limit is not None:
+            end = min(end, start + limit)
+        prefixes = self.prefixes
+        buckets = self.buckets
+        for sequence in range(start, end):
+            index = sequence - first_live
+            expression, result = store[index]
+            keys = set()
+            for word in entry_words(expression, result):
+                for length in range(1, min(len(word), PREFIX_LENGTH) + 1):
+                    keys.add(word[:length])
+            for key in keys:
+                posting = prefixes.get(key)
+                if posting is None:
+                    posting = prefixes[key] = array('q')
+                posting.append(sequence)
+
+            value = store.approximate_result(index)
+            if math.isnan(value):
+                continue
+            key = value_bucket(value)
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = (array('q'), array('d'))
+                insort(self.bucket_keys, key)
+            bucket[0].append(sequence)
+            bucket[1].append(value)
+        self.next_sequence = end
+        # Evicted sequence numbers are cut from the posting lists once as
+        # many entries have been evicted as the store holds
+        if first_live - self.trimmed_at >= max(len(store), 1):
+            self.trim(first_live)
+        return end == store.total_appended
+
+    def trim(self, first_live):
+        self.trimmed_at = first_live
+        for key, posting in list(self.prefixes.items()):
+            dead = bisect_left(posting, first_live)
+            if dead == len(posting):
+                del self.prefixes[key]
+            elif dead:
+                del posting[:dead]
+        for key, (sequences, values) in list(self.buckets.items()):
+            dead = bisect_left(sequences, first_live)
+            if dead == len(sequences):
+                del self.buckets[key]
+                self.bucket_keys.remove(key)
+            elif dead:
+                del sequences[:dead]
+                del values[:dead]
+
+    def search(self, query, limit=MAX_RESULTS):
+        # Returns up to `limit` matching sequence numbers, newest first
+        self.sync()
+        criteria = []
+        for match in RANGE_PATTERN.finditer(query):
+            criteria.append(("value",) + self.value_bounds(match))
+        text = RANGE_PATTERN.sub(" ", query).lower()
+        for word in set(WORD_PATTERN.findall(text)):
+            criteria.append(("word", word, None))
+        if not criteria:
+            return []
+
+        # The most selective criterion produces candidates, newest first, in
+        # chunks. Other short word prefixes are applied by intersecting with
+        # the matching slice of their posting lists; anything else is checked
+        # against the entry itself.
+        counts = [self.count(criterion) for criterion in criteria]
+        driver = criteria.pop(counts.index(min(counts)))
+        if driver[0] == "word" and len(driver[1]) > PREFIX_LENGTH:
+            criteria.append(driver)
+        postings = [self.prefixes.get(low, ()) for kind, low, _ in criteria
+                    if kind == "word" and len(low) <= PREFIX_LENGTH]
+        checks = [criterion for criterion in criteria
+                  if criterion[0] == "value" or len(criterion[1]) > PREFIX_LENGTH]
+        first_live = self.store.first_sequence()
+        results = []
+        for chunk in self.candidate_chunks(driver, first_live):
+            for posting in postings:
+                present = set(posting[bisect_left(posting, chunk[-1]):bisect_right(posting, chunk[0])])
+                chunk = [sequence for sequence in chunk if sequence in present]
+                if not chunk:
+                    break
+            for sequence in chunk:
+                if self.matches(sequence - first_live, checks):
+                    results.append(sequence)
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    def count(self, criterion):
+        kind, low, high = criterion
+        if kind == "word":
+            return len(self.prefixes.get(low[:PREFIX_LENGTH], ()))
+        start, stop = self.bucket_range(low, high)
+        return sum(len(self.buckets[key][0]) for key in self.bucket_keys[start:stop])
+
+    def bucket_range(self, low, high):
+        return (bisect_left(self.bucket_keys, value_bucket(low)),
+                bisect_right(self.bucket_keys, value_bucket(high)))
+
+    def candidate_chunks(self, criterion, first_live):
+        kind, low, high = criterion
+        if kind == "word":
+            yield from newest_chunks(self.prefixes.get(low[:PREFIX_LENGTH], array('q')), first_live)
+            return
+        start, stop = self.bucket_range(low, high)
+        streams = [newest_in_range(*self.buckets[key], low, high, first_live)
+                   for key in self.bucket_keys[start:stop]]
+        merged = streams[0] if len(streams) == 1 else heapq.merge(*streams, reverse=True)
+        while True:
+            chunk = list(islice(merged, CHUNK_SIZE))
+            if not chunk:
+                return
+            yield chunk
+
+    def matches(self, index, criteria):
+        text = None
+        for kind, low, high in criteria:
+            if kind == "value":
+                if not low <= self.store.approximate_result(index) <= high:
+                    return False
+                continue
+            if text is None:
+                expression, result = self.store[index]
+                text = f"{expression} {number_to_text(result)}".lower()
+            # Substring test first; most candidates fail it cheaply
+            if low not in text or not any(word.startswith(low) for word in WORD_PATTERN.findall(text)):
+                return False
+        return True
+
+    def value_bounds(self, match):
+        if match.group("op") is None:
+            low, high = float(match.group("low")), float(match.group("high"))
+            return min(low, high), max(low, high)
+        op, value = match.group("op"), float(match.group("value"))
+        if op == ">":
+            return math.nextafter(value, math.inf), math.inf
+        elif op == ">=":
+            return value, math.inf
+        elif op == "<":
+            return -math.inf, math.nextafter(value, -math.inf)
+        elif op == "<=":
+            return -math.inf, value
+        return value, value
@@ -0,0 +1,189 @@
+import argparse
+import mmap
+import os
+import sys
+import time
+from decimal import Decimal
+from fractions import Fraction
+
+from engine import INTEGER_PATTERN, number_to_text
+
+DEFAULT_HISTORY_PATH = os.path.join(os.path.expanduser("~"), ".modern_calculator", "history.log")
+
+# One entry per line: "<expression>\t<result>\n". Floats are written with
+# repr() and exact results with str(); Decimals carry a trailing "d" since
+# their text can look exactly like a float's ("0.3").
+FIELD_SEPARATOR = b"\t"
+RECORD_SEPARATOR = b"\n"
+DECIMAL_TAG = "d"
+
+
+def encode_entry(expression, result):
+    expression = expression.replace("\t", " ").replace("\n", " ")
+    text = number_to_text(result)
+    if type(result) is Decimal:
+        text += DECIMAL_TAG
+    return f"{expression}\t{text}\n".encode("utf-8")
+
+
+def decode_result(text):
+    if text.endswith(DECIMAL_TAG):
+        return Decimal(text[:-len(DECIMAL_TAG)])
+    if "/" in text:
+        return Fraction(text)
+    if INTEGER_PATTERN.fullmatch(text):
+        return int(text)
+    # Only a float's own repr (inf and nan included) reads back as a float;
+    # exact results too long for str() were logged in scientific notation
+    # and would overflow one
+    value = float(text)
+    if repr(value) == text:
+        return value
+    return Decimal(text)
+
+
+def decode_entry(line):
+    expression, _, result = line.partition(FIELD_SEPARATOR)
+    return expression.decode("utf-8"), decode_result(result.decode("ascii"))
+
+
+class HistoryLog:
+    # Append-only history file. Every append is flushed to the OS, so a
+    # killed process loses nothing; fsyncs are batched, either every
+    # `sync_every` entries or once `sync_interval` seconds have passed since
+    # the last sync. Owners call sync() on a timer so a short burst is not
+    # left waiting for the next append (see pending()).
+    def __init__(self, path=DEFAULT_HISTORY_PATH, sync_every=32, sync_interval=2.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._file = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def append(self, expression, result):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._open_for_append()
+        self._file.write(encode_entry(expression, result))
+        self._file.flush()
+        self._pending += 1
+        if (self._pending >= self.sync_every
+                or time.monotonic() - self._last_sync >= self.sync_interval):
+            self.sync()
+
+    def _open_for_append(self):
+        self._file = open(self.path, "ab", buffering=64 * 1024)
+        if self._file.tell() > 0:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != RECORD_SEPARATOR:
+                    # Terminate a line torn by a crash so it stays separate
+                    self._file.write(RECORD_SEPARATOR)
+
+    def append_many(self, entries):
+        # One write and at most one fsync for the whole batch
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._open_for_append()
+        self._file.write(b"".join(encode_entry(expression, result) for expression, result in entries))
+        self._file.flush()
+        self._pending += len(entries)
+        if (self._pending >= self.sync_every
+                or time.monotonic() - self._last_sync >= self.sync_interval):
+            self.sync()
+
+    def pending(self):
+        # Entries written since the last fsync
+        return self._pending
+
+    def sync(self):
+        if self._file is None or not self._pending:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def read_tail(self, count):
+        # Maps the file and walks backwards from the end, so only the last
+        # `count` lines are ever decoded regardless of the file size.
+        if count <= 0:
+            return []
+        self.sync()
+        try:
+            with open(self.path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return []
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    end = data.rfind(RECORD_SEPARATOR) + 1  # drop a torn final line
+                    if end == 0:
+                        return []
+                    start = end - 1
+                    for _ in range(count):
+                        start = data.rfind(RECORD_SEPARATOR, 0, start)
+                        if start == -1:
+                            break
+                    tail = data[start + 1:end]
+        except FileNotFoundError:
+            return []
+
+        entries = []
+        for line in tail.split(RECORD_SEPARATOR):
+            if not line:
+                continue
+            try:
+                entries.append(decode_entry(line))
+            except (UnicodeDecodeError, ValueError):
+                continue
+        return entries
+
+    def compact(self, keep):
+        # Rewrites the log with only the newest `keep` entries. The new file
+        # is written next to the old one and swapped in atomically.
+        entries = self.read_tail(keep)
+        was_open = self._file is not None
+        self.close()
+        temp_path = self.path + ".compact"
+        with open(temp_path, "wb") as f:
+            for expression, result in entries:
+                f.write(encode_entry(expression, result))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        if was_open:
+            self._open_for_append()
+        return len(entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the calculator history log.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    compact = subcommands.add_parser("compact", help="drop all but the newest entries")
+    compact.add_argument("--path", default=DEFAULT_HISTORY_PATH)
+    compact.add_argument("--keep", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    if args.command == "compact":
+        if not os.path.exists(args.path):
+            print(f"No history log at {args.path}", file=sys.stderr)
+            return 1
+        before = os.path.getsize(args.path)
+        kept = HistoryLog(args.path).compact(args.keep)
+        after = os.path.getsize(args.path)
+        print(f"Kept {kept} entries, {before} -> {after} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
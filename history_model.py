@@ -0,0 +1,118 @@
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex
+
+from formatting import NumberFormat
+from history import HistoryStore
+
+
+class HistoryModel(QAbstractListModel):
+    # Rows are presented newest first, so row 0 maps to the last entry. The
+    # row count is cached so that the many rowCount() calls a view makes
+    # while laying out stay cheap, and so that bulk appends can be deferred
+    # (see defer_updates) without the view seeing the store change under it.
+    # A search filter (set_filter) replaces the rows with a list of entry
+    # sequence numbers, newest first.
+    def __init__(self, store=None, font=None, parent=None, number_format=None):
+        super().__init__(parent)
+        self.store = store if store is not None else HistoryStore()
+        self.font = font
+        self.number_format = number_format or NumberFormat()
+        self.rows = len(self.store)
+        self.deferred = False
+        self.matches = None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.rows
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            if self.matches is None:
+                position = len(self.store) - 1 - index.row()
+            else:
+                position = self.matches[index.row()] - self.store.first_sequence()
+                if position < 0:
+                    return None
+            entry = self.store[position]
+            return f"{entry.expression} = {self.number_format.format(entry.result)}"
+        if role == Qt.ItemDataRole.FontRole:
+            return self.font
+        return None
+
+    def append(self, expression, result):
+        if self.deferred or self.matches is not None:
+            self.store.append(expression, result)
+            return
+        if len(self.store) == self.store.capacity:
+            last_row = len(self.store) - 1
+            self.beginRemoveRows(QModelIndex(), last_row, last_row)
+            self.store.evict_oldest()
+            self.rows -= 1
+            self.endRemoveRows()
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self.store.append(expression, result)
+        self.rows += 1
+        self.endInsertRows()
+
+    def extend(self, entries):
+        # Batch insert for pastes and imports: the rows evicted to make room
+        # are removed as one block and the new rows inserted as another.
+        if not entries:
+            return
+        store = self.store
+        if self.deferred or self.matches is not None:
+            for expression, result in entries:
+                store.append(expression, result)
+            return
+        if len(entries) >= store.capacity:
+            self.beginResetModel()
+            for expression, result in entries:
+                store.append(expression, result)
+            self.rows = len(store)
+            self.endResetModel()
+            return
+        overflow = len(store) + len(entries) - store.capacity
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), len(store) - overflow, len(store) - 1)
+            for _ in range(overflow):
+                store.evict_oldest()
+            self.rows -= overflow
+            self.endRemoveRows()
+        self.beginInsertRows(QModelIndex(), 0, len(entries) - 1)
+        for expression, result in entries:
+            store.append(expression, result)
+        self.rows += len(entries)
+        self.endInsertRows()
+
+    def defer_updates(self, deferred):
+        # While deferred, appends only touch the store; the view catches up
+        # with a single reset once updates resume.
+        if deferred == self.deferred:
+            return
+        self.deferred = deferred
+        if not deferred:
+            self.refresh()
+
+    def set_filter(self, sequences):
+        # None shows the whole history again
+        self.matches = sequences
+        self.refresh()
+
+    def set_number_format(self, number_format):
+        self.number_format = number_format
+        self.refresh()
+
+    def refresh(self):
+        self.beginResetModel()
+        self.rows = len(self.store) if self.matches is None else len(self.matches)
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self.store.clear()
+        if self.matches is not None:
+            self.matches = []
+        self.rows = 0
+        self.endResetModel()
@@ -0,0 +1,90 @@
+import json
+import time
+from collections import deque
+
+# Recent samples kept per histogram; percentiles describe this window
+HISTOGRAM_SAMPLES = 2048
+
+
+class Histogram:
+    # Durations in seconds. The call count and total cover the whole run,
+    # the percentiles only the most recent HISTOGRAM_SAMPLES calls.
+    def __init__(self, size=HISTOGRAM_SAMPLES):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        summary = {"count": self.count, "total_ms": round(self.total * 1000, 3)}
+        if ordered:
+            for name, fraction in (("p50", 0.5), ("p99", 0.99)):
+                index = min(len(ordered) - 1, int(fraction * len(ordered)))
+                summary[f"{name}_ms"] = round(ordered[index] * 1000, 3)
+            summary["max_ms"] = round(ordered[-1] * 1000, 3)
+        return summary
+
+
+class Timer:
+    # Reusable context manager for one histogram. Starts are stacked so a
+    # handler that re-enters itself is still timed correctly.
+    __slots__ = ("histogram", "starts")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.starts = []
+
+    def __enter__(self):
+        self.starts.append(time.perf_counter())
+
+    def __exit__(self, *exc_info):
+        self.histogram.record(time.perf_counter() - self.starts.pop())
+        return False
+
+
+class Instrumentation:
+    # Counters and timing histograms for the GUI hot paths. Cheap enough to
+    # stay on all the time: a timed block costs two perf_counter() calls.
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.counters = {}
+        self.histograms = {}
+        self.timers = {}
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def measure(self, name):
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = Timer(self.histogram(name))
+        return timer
+
+    def calls(self, name):
+        histogram = self.histograms.get(name)
+        return histogram.count if histogram is not None else 0
+
+    def snapshot(self):
+        return {
+            "uptime_s": round(time.perf_counter() - self.started, 3),
+            "counters": dict(self.counters),
+            "histograms": {name: histogram.summary() for name, histogram in self.histograms.items()},
+        }
+
+    def export(self, path, **extra):
+        snapshot = self.snapshot()
+        snapshot.update(extra)
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(snapshot, handle, indent=2)
+
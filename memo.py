@@ -0,0 +1,54 @@
+from collections import OrderedDict
+
+DEFAULT_MEMO_SIZE = 4096
+
+MISSING = object()
+
+
+class MemoCache:
+    # Bounded LRU mapping with hit/miss statistics. Callers build keys that
+    # capture everything the value depends on and only store successful
+    # results; see CalculatorEngine.memo_key.
+    def __init__(self, capacity=DEFAULT_MEMO_SIZE):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=MISSING):
+        value = self.entries.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if self.capacity <= 0:
+            return
+        entries = self.entries
+        if key in entries:
+            entries.move_to_end(key)
+        entries[key] = value
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
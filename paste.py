@@ -0,0 +1,113 @@
+import time
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from engine import CalculationError
+
+# Time each event-loop tick may spend evaluating before yielding to repaint
+SLICE_SECONDS = 0.008
+
+
+def iter_lines(text):
+    # Yields (line, end offset) without splitting the whole payload up front
+    start = 0
+    length = len(text)
+    while start < length:
+        end = text.find('\n', start)
+        if end == -1:
+            end = length
+        line = text[start:end].strip()
+        start = end + 1
+        if line:
+            yield line, min(start, length)
+
+
+def iter_file_lines(path):
+    # Same as iter_lines, read lazily from a file; offsets are in bytes
+    position = 0
+    with open(path, "rb") as handle:
+        for raw in handle:
+            position += len(raw)
+            line = raw.decode("utf-8", "replace").strip()
+            if line:
+                yield line, position
+
+
+class PasteEvaluator(QObject):
+    # Evaluates a pasted payload line by line in short time slices on the GUI
+    # thread, handing results over in batches so the window keeps painting.
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(int, int)
+
+    def __init__(self, engine, add_entries, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.add_entries = add_entries
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.process_slice)
+        self.lines = None
+        self.sink = add_entries
+        self.length = 0
+        self.evaluated = 0
+        self.failed = 0
+
+    def start(self, text, add_entries=None):
+        self.start_lines(iter_lines(text), len(text), add_entries)
+
+    def start_lines(self, lines, length, add_entries=None):
+        # add_entries overrides the constructor's sink for this run only
+        self.cancel()
+        self.lines = lines
+        self.length = max(length, 1)
+        self.sink = add_entries or self.add_entries
+        self.evaluated = 0
+        self.failed = 0
+        self.progress.emit(0)
+        self.timer.start()
+
+    def is_running(self):
+        return self.lines is not None
+
+    def cancel(self):
+        if self.lines is not None:
+            self.timer.stop()
+            self.lines = None
+            self.finished.emit(self.evaluated, self.failed)
+
+    def process_slice(self):
+        evaluate = self.engine.evaluate
+        is_expensive = self.engine.is_expensive
+        entries = []
+        deadline = time.perf_counter() + SLICE_SECONDS
+        position = None
+        try:
+            for line, position in self.lines:
+                # Lines too slow for one slice would freeze the window, so
+                # they fail; the keypad's background worker can take them
+                if is_expensive("evaluate", line):
+                    self.failed += 1
+                    continue
+                try:
+                    entries.append((line, evaluate(line)))
+                except CalculationError:
+                    self.failed += 1
+                if len(entries) % 256 == 0 and time.perf_counter() >= deadline:
+                    break
+            else:
+                position = None
+        except OSError:
+            # A file that can no longer be read ends the run
+            self.failed += 1
+            position = None
+
+        self.evaluated += len(entries)
+        if entries:
+            self.sink(entries)
+        if position is None:
+            self.timer.stop()
+            self.lines = None
+            self.progress.emit(100)
+            self.finished.emit(self.evaluated, self.failed)
+        else:
+            self.progress.emit(position * 100 // self.length)
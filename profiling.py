@@ -0,0 +1,39 @@
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def mark(self, name):
+        # Records a milestone measured from profiler creation
+        self.phases.append((name, time.perf_counter() - self.started))
+
+    def report(self, stream=None):
+        stream = stream or sys.stderr
+        width = max((len(name) for name, _ in self.phases), default=0)
+        for name, seconds in self.phases:
+            print(f"{name:<{width}}  {seconds * 1000:8.2f} ms", file=stream)
+
+
+class NullProfiler:
+    @contextmanager
+    def phase(self, name):
+        yield
+
+    def mark(self, name):
+        pass
+
+    def report(self, stream=None):
+        pass
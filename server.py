@@ -0,0 +1,406 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Like cli.py this stays free of PyQt6 so the service runs headless.
+from engine import CalculatorEngine, CalculationError, FLOAT, MODES
+from cli import json_value
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 16 * 1024 * 1024
+LATENCY_SAMPLES = 10000
+# Same bound as the GUI's Decimal Mode dialog
+MAX_PRECISION = 1000
+# Engines are kept per (mode, precision), least recently used dropped first
+MAX_ENGINES = 16
+EXPENSIVE_WORKERS = 2
+# Batches longer than this go to the worker pool even if every line is cheap
+MAX_INLINE_BATCH = 256
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+CALCULATION_ERROR = -32000
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large"}
+
+
+class RPCError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyRecorder:
+    # Keeps the most recent request durations (in seconds) for percentiles
+    def __init__(self, size=LATENCY_SAMPLES):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, ordered, fraction):
+        index = min(len(ordered) - 1, int(fraction * len(ordered)))
+        return ordered[index]
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        summary = {"requests": self.count}
+        if ordered:
+            for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+                summary[f"{name}_ms"] = round(self.percentile(ordered, fraction) * 1000, 3)
+            summary["max_ms"] = round(ordered[-1] * 1000, 3)
+        return summary
+
+
+class CalculatorService:
+    # JSON-RPC 2.0 over HTTP/1.1. Connections are kept alive and requests
+    # are answered in the order they arrive, so a client may pipeline them.
+    # Methods:
+    #   evaluate(expression, mode="float", precision=None) -> result
+    #   evaluate_batch(expressions, mode="float", precision=None) -> [{"result"} | {"error"}]
+    #   stats() -> request count and latency percentiles
+    def __init__(self):
+        self.engines = OrderedDict()
+        self.executor = None
+        self.latency = LatencyRecorder()
+        self.methods = {
+            "evaluate": self.evaluate,
+            "evaluate_batch": self.evaluate_batch,
+            "stats": self.stats,
+        }
+
+    def engine(self, mode=FLOAT, precision=None):
+        if precision is not None and (type(precision) is not int or not 1 <= precision <= MAX_PRECISION):
+            raise RPCError(INVALID_PARAMS, f"precision must be an integer from 1 to {MAX_PRECISION}")
+        key = (mode, precision)
+        engine = self.engines.get(key)
+        if engine is None:
+            if mode not in MODES:
+                raise RPCError(INVALID_PARAMS, f"Unknown numeric mode: {mode!r}")
+            engine = CalculatorEngine(mode)
+            if precision is not None:
+                engine.set_mode(mode, precision)
+            self.engines[key] = engine
+            if len(self.engines) > MAX_ENGINES:
+                self.engines.popitem(last=False)
+        else:
+            self.engines.move_to_end(key)
+        return engine
+
+    async def run(self, engine, operation, *args):
+        # Work that is_expensive() flags (it sizes the compiled expression)
+        # and long batches go to a worker process, so one request cannot
+        # stall the event loop and every other connection
+        if operation == "evaluate_many":
+            expressions = args[0]
+            expensive = (len(expressions) > MAX_INLINE_BATCH
+                         or any(engine.is_expensive("evaluate", expression) for expression in expressions))
+        else:
+            expensive = engine.is_expensive(operation, *args)
+        if not expensive:
+            return run_job(engine, operation, args)
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(EXPENSIVE_WORKERS,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, run_job, (engine.mode, engine.precision), operation, args)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def evaluate(self, expression, mode=FLOAT, precision=None):
+        if type(expression) is not str:
+            raise RPCError(INVALID_PARAMS, "expression must be a string")
+        try:
+            return await self.run(self.engine(mode, precision), "evaluate", expression)
+        except CalculationError as exc:
+            raise RPCError(CALCULATION_ERROR, str(exc)) from None
+
+    async def evaluate_batch(self, expressions, mode=FLOAT, precision=None):
+        if type(expressions) is not list or not all(type(expression) is str for expression in expressions):
+            raise RPCError(INVALID_PARAMS, "expressions must be an array of strings")
+        return await self.run(self.engine(mode, precision), "evaluate_many", expressions)
+
+    def stats(self):
+        return self.latency.summary()
+
+    async def call(self, request):
+        if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or "method" not in request:
+            return error_response(None, INVALID_REQUEST, "Invalid request")
+        request_id = request.get("id")
+        method = self.methods.get(request["method"])
+        if method is None:
+            return error_response(request_id, METHOD_NOT_FOUND, f"Unknown method: {request['method']!r}")
+        params = request.get("params", [])
+        try:
+            if isinstance(params, dict):
+                result = method(**params)
+            elif isinstance(params, list):
+                result = method(*params)
+            else:
+                raise TypeError("params must be an array or an object")
+            if asyncio.iscoroutine(result):
+                result = await result
+        except RPCError as exc:
+            return error_response(request_id, exc.code, str(exc))
+        except TypeError as exc:
+            return error_response(request_id, INVALID_PARAMS, str(exc))
+        except Exception as exc:
+            # Anything unexpected is reported instead of dropping the connection
+            return error_response(request_id, INTERNAL_ERROR, f"Internal error: {exc}")
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    async def handle_body(self, body):
+        try:
+            payload = json.loads(body)
+        except (ValueError, UnicodeDecodeError):
+            return error_response(None, PARSE_ERROR, "Parse error")
+        if isinstance(payload, list):
+            if not payload:
+                return error_response(None, INVALID_REQUEST, "Empty batch")
+            return [await self.call(request) for request in payload]
+        return await self.call(payload)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                start = time.perf_counter()
+                method, path, headers, body = request
+                status, payload = await self.route(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(encode_response(status, payload, keep_alive))
+                self.latency.record(time.perf_counter() - start)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except HTTPError as exc:
+            writer.write(encode_response(exc.status, {"error": str(exc)}, False))
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+            except ConnectionError:
+                pass
+
+    async def route(self, method, path, body):
+        if path == "/stats":
+            return 200, self.stats()
+        if path not in ("/", "/rpc"):
+            return 404, {"error": "Not found"}
+        if method != "POST":
+            return 405, {"error": "Use POST"}
+        return 200, await self.handle_body(body)
+
+
+def run_job(engine, operation, args):
+    # Evaluates and converts to JSON values (printing a huge number can cost
+    # as much as computing it). Also the worker-process entry point, where
+    # `engine` arrives as (mode, precision) and a fresh engine is built.
+    if type(engine) is tuple:
+        engine = CalculatorEngine(*engine)
+    if operation == "evaluate_many":
+        return [{"error": str(result)} if isinstance(result, CalculationError) else {"result": json_value(result)}
+                for result in engine.evaluate_many(*args)]
+    return json_value(getattr(engine, operation)(*args))
+
+
+def error_response(request_id, code, message):
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+async def read_request(reader):
+    # Returns (method, path, headers, body) or None once the client is done
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, path, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Malformed request line") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length") from None
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+
+def encode_response(status, payload, keep_alive=True):
+    body = json.dumps(payload).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+class CalculatorClient:
+    # Blocking client for CalculatorService over one persistent connection.
+    # `address` is "host:port" or "unix:/path/to/socket".
+    def __init__(self, address=f"{DEFAULT_HOST}:{DEFAULT_PORT}", timeout=5.0):
+        self.address = address
+        self.timeout = timeout
+        self.sock = None
+        self.stream = None
+        self.next_id = 0
+
+    def connect(self):
+        if self.address.startswith("unix:"):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            target = self.address[len("unix:"):]
+        else:
+            host, _, port = self.address.rpartition(":")
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            target = (host or DEFAULT_HOST, int(port))
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(target)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+        self.stream = sock.makefile("rb")
+
+    def close(self):
+        if self.sock is not None:
+            self.stream.close()
+            self.sock.close()
+            self.sock = None
+            self.stream = None
+
+    def request_bytes(self, method, params):
+        self.next_id += 1
+        body = json.dumps({"jsonrpc": "2.0", "id": self.next_id, "method": method,
+                           "params": params}).encode("utf-8")
+        return (f"POST /rpc HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body
+
+    def read_response(self):
+        status_line = self.stream.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection")
+        length = 0
+        while True:
+            line = self.stream.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        response = json.loads(self.stream.read(length))
+        if "error" in response:
+            error = response["error"]
+            raise CalculationError(error["message"] if isinstance(error, dict) else error)
+        return response["result"]
+
+    def call(self, method, params):
+        # A dropped keep-alive connection is reopened once
+        for attempt in (0, 1):
+            if self.sock is None:
+                self.connect()
+            try:
+                self.sock.sendall(self.request_bytes(method, params))
+                return self.read_response()
+            except (ConnectionError, socket.timeout):
+                self.close()
+                if attempt:
+                    raise
+
+    def evaluate(self, expression, mode=FLOAT, precision=None):
+        return self.call("evaluate", {"expression": expression, "mode": mode, "precision": precision})
+
+    def evaluate_batch(self, expressions, mode=FLOAT, precision=None):
+        return self.call("evaluate_batch", {"expressions": list(expressions), "mode": mode,
+                                            "precision": precision})
+
+    def pipeline(self, expressions, mode=FLOAT, precision=None):
+        # Sends one evaluate request per expression before reading any
+        # response. Failed expressions yield a CalculationError in place.
+        if self.sock is None:
+            self.connect()
+        requests = [self.request_bytes("evaluate", {"expression": expression, "mode": mode,
+                                                    "precision": precision})
+                    for expression in expressions]
+        self.sock.sendall(b"".join(requests))
+        results = []
+        for _ in requests:
+            try:
+                results.append(self.read_response())
+            except CalculationError as exc:
+                results.append(exc)
+        return results
+
+    def stats(self):
+        return self.call("stats", [])
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+    service = CalculatorService()
+    if unix_path:
+        if os.path.exists(unix_path):
+            os.unlink(unix_path)
+        server = await asyncio.start_unix_server(service.handle_connection, unix_path)
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+    address = unix_path or f"{host}:{server.sockets[0].getsockname()[1]}"
+    print(f"Calculator service listening on {address}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+        print(json.dumps(service.stats()), file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve calculator evaluation over local JSON-RPC")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+class SessionState:
+    # Input state of one calculator tab. Everything else (widgets, engine,
+    # history store, theme) is shared by all sessions of a window.
+    __slots__ = ("current_input", "stored_value", "current_operator", "expression_input",
+                 "history_text", "last_result")
+
+    def __init__(self):
+        self.current_input = "0"
+        self.stored_value = None
+        self.current_operator = None
+        self.expression_input = ""
+        self.history_text = ""
+        self.last_result = None
+
+
+def session_attribute(name):
+    # Class-level property forwarding `name` to the active session, so the
+    # handlers keep using self.current_input and friends unchanged.
+    def get(self):
+        return getattr(self.session, name)
+
+    def set(self, value):
+        setattr(self.session, name, value)
+
+    return property(get, set)
@@ -0,0 +1,149 @@
+import math
+from bisect import insort
+
+from history import approximate
+
+DEFAULT_QUANTILES = (0.25, 0.5, 0.75)
+# Values per quantile kept exactly before the P² markers take over
+EXACT_VALUES = 500
+
+
+class P2Quantile:
+    # P² estimate of one quantile (Jain & Chlamtac, 1985): five markers are
+    # nudged towards their ideal positions with a piecewise-parabolic fit,
+    # so memory stays constant however many values are added. P² is poor
+    # on few values, so the first EXACT_VALUES are kept sorted and give the
+    # exact quantile; the markers start from them once there are more.
+    __slots__ = ("p", "buffer", "heights", "positions", "desired", "increments")
+
+    def __init__(self, p):
+        if not 0 < p < 1:
+            raise ValueError("Quantile must be between 0 and 1")
+        self.p = p
+        self.buffer = []
+        self.heights = None
+        self.positions = None
+        self.desired = None
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, value):
+        heights = self.heights
+        if heights is None:
+            insort(self.buffer, value)
+            if len(self.buffer) > EXACT_VALUES:
+                self._start_markers()
+            return
+
+        positions = self.positions
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = 0
+            while value >= heights[cell + 1]:
+                cell += 1
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        desired = self.desired
+        for i in range(5):
+            desired[i] += self.increments[i]
+
+        for i in (1, 2, 3):
+            offset = desired[i] - positions[i]
+            if ((offset >= 1 and positions[i + 1] - positions[i] > 1)
+                    or (offset <= -1 and positions[i - 1] - positions[i] < -1)):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+
+    def _start_markers(self):
+        # Markers at the ranks P² would have reached after these values,
+        # kept distinct so every marker has its own rank
+        values, self.buffer = self.buffer, None
+        count = len(values)
+        self.desired = [1 + (count - 1) * increment for increment in self.increments]
+        positions = [round(desired) for desired in self.desired]
+        for i in (1, 2, 3):
+            positions[i] = min(max(positions[i], positions[i - 1] + 1), count - 4 + i)
+        self.positions = positions
+        self.heights = [values[position - 1] for position in positions]
+
+    def _parabolic(self, i, step):
+        q = self.heights
+        n = self.positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def value(self):
+        if self.heights is not None:
+            return self.heights[2]
+        # Linear interpolation between the closest ranks, as numpy does
+        values = self.buffer
+        if not values:
+            return math.nan
+        index = self.p * (len(values) - 1)
+        low = int(index)
+        if low == index:
+            return values[low]
+        return values[low] + (values[low + 1] - values[low]) * (index - low)
+
+
+class StreamingStats:
+    # Single pass summary: Welford's mean and variance, running sum, min
+    # and max, and quantiles (exact up to EXACT_VALUES values, P² after).
+    # Non-finite values are counted as invalid and otherwise ignored; huge
+    # exact values count as infinite.
+    def __init__(self, quantiles=DEFAULT_QUANTILES):
+        self.count = 0
+        self.invalid = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.quantiles = [P2Quantile(p) for p in quantiles]
+
+    def add(self, value):
+        value = approximate(value)
+        if not math.isfinite(value):
+            self.invalid += 1
+            return
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+        for quantile in self.quantiles:
+            quantile.add(value)
+
+    def extend(self, values):
+        for value in values:
+            self.add(value)
+
+    def variance(self):
+        # Population variance; sample_variance divides by n - 1
+        return self.m2 / self.count if self.count else math.nan
+
+    def sample_variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    def summary(self):
+        summary = {"count": self.count, "invalid": self.invalid}
+        if self.count:
+            summary.update(sum=self.total, mean=self.mean, variance=self.variance(),
+                           std=math.sqrt(self.variance()), sample_std=math.sqrt(self.sample_variance()),
+                           min=self.minimum, max=self.maximum)
+            for quantile in self.quantiles:
+                summary[f"p{quantile.p * 100:g}"] = quantile.value()
+        return summary
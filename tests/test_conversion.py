@@ -0,0 +1,63 @@
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+from conversion import convert, convert_many, to_base, unit_name, whole_number
+from engine import CalculationError
+
+
+def test_exact_conversions():
+    assert convert(1, "in", "cm") == Fraction(127, 50)
+    assert convert(Fraction(1), "mi", "km") == Fraction(1609344, 1000000)
+    assert convert(100, "C", "F") == 212
+    assert convert(Decimal("32"), "F", "C") == 0
+    assert convert(1, "GiB", "MiB") == 1024
+
+
+def test_float_conversions_stay_floats():
+    result = convert(1.0, "km", "mi")
+    assert type(result) is float
+    assert result == pytest.approx(0.621371192)
+
+
+def test_units_are_case_insensitive_where_unambiguous():
+    assert unit_name("KM") == "km"
+    assert unit_name("mib") == "MiB"
+    with pytest.raises(CalculationError):
+        unit_name("parsec")
+
+
+def test_incompatible_units():
+    with pytest.raises(CalculationError):
+        convert(1, "km", "kg")
+
+
+@pytest.mark.parametrize("value", [Decimal("NaN"), Decimal("Infinity")])
+def test_non_finite_decimals(value):
+    with pytest.raises(CalculationError):
+        convert(value, "km", "mi")
+
+
+def test_convert_many():
+    assert convert_many([1.0, 2.0], "km", "m") == [1000.0, 2000.0]
+    assert convert_many([1, 2.5], "m", "cm") == [100, 250.0]
+
+
+def test_to_base():
+    assert to_base(255, 16) == "0xff"
+    assert to_base(-5, 2) == "-0b101"
+    assert to_base(8.0, 8) == "0o10"
+    assert to_base(Fraction(12, 1), 10) == "12"
+    big = 2 ** 20000
+    assert to_base(big, 16) == "0x1" + "0" * 5000
+    with pytest.raises(CalculationError):
+        to_base(Fraction(1, 2), 16)
+    with pytest.raises(CalculationError):
+        to_base(10, 7)
+
+
+def test_whole_number():
+    assert whole_number(Decimal("4.0")) == 4
+    with pytest.raises(CalculationError):
+        whole_number(Decimal("NaN"))
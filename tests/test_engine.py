@@ -0,0 +1,159 @@
+import decimal
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+from engine import (CalculatorEngine, CalculationError, FLOAT, DECIMAL, FRACTION, MODES,
+                    EXPENSIVE_BITS, MAX_EXACT_EXPONENT, estimate_bits, number_to_text)
+
+
+@pytest.fixture(params=MODES)
+def engine(request):
+    return CalculatorEngine(request.param)
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("1 + 2 × 3", 7),
+    ("(1 + 2) × 3", 9),
+    ("10 - 4 - 3", 3),
+    ("2^3^2", 512),
+    ("-2^2", -4),
+    ("3²", 9),
+    ("2 × 3²", 18),
+    ("√16 + 1", 5),
+    ("50%", Fraction(1, 2)),
+    ("2(1 + 4)", 10),
+    ("12 ÷ 4 ÷ 3", 1),
+    ("2 ** 3 * 4 / 8", 4),
+])
+def test_precedence(engine, expression, expected):
+    assert engine.evaluate(expression) == expected
+
+
+def test_variables(engine):
+    assert engine.evaluate("3x + 1", {"x": 2}) == 7
+    with pytest.raises(CalculationError):
+        engine.evaluate("3y")
+
+
+@pytest.mark.parametrize("expression", ["", "1 +", "(1 + 2", "1 2 )", "2 $ 3"])
+def test_malformed_expressions(engine, expression):
+    with pytest.raises(CalculationError):
+        engine.evaluate(expression)
+
+
+def test_result_types():
+    assert type(CalculatorEngine(FLOAT).evaluate("1 ÷ 4")) is float
+    assert CalculatorEngine(DECIMAL).evaluate("1 ÷ 4") == Decimal("0.25")
+    assert CalculatorEngine(FRACTION).evaluate("1 ÷ 3") == Fraction(1, 3)
+    # Integers stay ints in the exact modes
+    assert type(CalculatorEngine(DECIMAL).evaluate("6 ÷ 3")) is int
+    assert type(CalculatorEngine(FRACTION).evaluate("2^100")) is int
+
+
+def test_exact_modes_avoid_float_noise():
+    assert CalculatorEngine(FLOAT).evaluate("0.1 + 0.2") != 0.3
+    assert CalculatorEngine(DECIMAL).evaluate("0.1 + 0.2") == Decimal("0.3")
+    assert CalculatorEngine(FRACTION).evaluate("0.1 + 0.2") == Fraction(3, 10)
+
+
+def test_decimal_precision():
+    engine = CalculatorEngine(DECIMAL, precision=10)
+    assert engine.evaluate("1 ÷ 3") == Decimal("0.3333333333")
+
+
+def test_division_by_zero_is_nan(engine):
+    assert engine.evaluate("1 ÷ 0") != engine.evaluate("1 ÷ 0")
+
+
+def test_decimal_number_rejects_non_finite_text():
+    engine = CalculatorEngine(DECIMAL)
+    for text in ("nan", "inf", "-Infinity", "sNaN"):
+        with pytest.raises(CalculationError):
+            engine.number(text)
+
+
+def test_square_root_errors():
+    engine = CalculatorEngine(DECIMAL)
+    with pytest.raises(CalculationError):
+        engine.square_root(-4)
+    with pytest.raises(CalculationError):
+        engine.square_root(Decimal("NaN"))
+    assert CalculatorEngine(FRACTION).square_root(Fraction(9, 4)) == Fraction(3, 2)
+
+
+@pytest.mark.parametrize("mode", [DECIMAL, FRACTION])
+def test_zero_to_negative_power(mode):
+    with pytest.raises(CalculationError):
+        CalculatorEngine(mode).evaluate("0^-1")
+
+
+def test_exponent_limit():
+    with pytest.raises(CalculationError):
+        CalculatorEngine(FRACTION).power(2, MAX_EXACT_EXPONENT + 1)
+
+
+def test_is_expensive_sizes_the_expression():
+    engine = CalculatorEngine(FRACTION)
+    assert not engine.is_expensive("evaluate", "2^1000 + 1")
+    assert engine.is_expensive("evaluate", "7^50000")
+    # Chained squares and scientific exponents that no look at the text catches
+    assert engine.is_expensive("evaluate", "99999" + "²" * 16)
+    assert engine.is_expensive("evaluate", "1e5^1e5")
+    assert not CalculatorEngine(FLOAT).is_expensive("evaluate", "1e5^1e5")
+    # Decimal-mode powers of non-integers are bounded by the precision
+    assert not CalculatorEngine(DECIMAL).is_expensive("evaluate", "1.5^50000")
+
+
+def test_estimate_bits_tracks_powers():
+    assert estimate_bits("2^10000", FRACTION, 28) == pytest.approx(10000)
+    assert estimate_bits("(2^100)²", FRACTION, 28) == pytest.approx(200)
+    assert estimate_bits("x^2", FRACTION, 28) == 0
+
+
+def test_huge_expressions_are_refused():
+    with pytest.raises(CalculationError):
+        CalculatorEngine(FRACTION).evaluate("99999" + "²" * 24)
+
+
+def test_memo_skips_huge_results():
+    engine = CalculatorEngine(FRACTION)
+    engine.evaluate("2^500")
+    assert engine.evaluate("2^500") == 2 ** 500
+    assert engine.memo.hits >= 1
+    engine.power(2 ** 60000, 2)
+    assert all(not isinstance(value, int) or value.bit_length() <= EXPENSIVE_BITS
+               for value in engine.memo.entries.values())
+
+
+def test_memo_keys_include_the_mode():
+    engine = CalculatorEngine(FLOAT)
+    assert type(engine.evaluate("1 ÷ 4")) is float
+    engine.set_mode(FRACTION)
+    assert engine.evaluate("1 ÷ 4") == Fraction(1, 4)
+
+
+def test_evaluate_many_yields_errors_in_place(engine):
+    results = list(engine.evaluate_many(["1 + 1", "1 +", "2 × 3"]))
+    assert results[0] == 2 and results[2] == 6
+    assert isinstance(results[1], CalculationError)
+
+
+def test_coerce_between_modes():
+    assert CalculatorEngine(FRACTION).coerce(0.5) == Fraction(1, 2)
+    assert CalculatorEngine(DECIMAL).coerce(Fraction(1, 4)) == Decimal("0.25")
+    with pytest.raises(CalculationError):
+        CalculatorEngine(FLOAT).coerce(10 ** 400)
+
+
+def test_number_to_text():
+    assert number_to_text(Fraction(1, 3)) == "1/3"
+    assert number_to_text(10 ** 20) == "100000000000000000000"
+    # Past the int string-length limit: scientific notation, from the leading bits
+    text = number_to_text(3 * 10 ** 5000)
+    assert text == "3.000000000000000000000000000e+5000"
+    assert number_to_text(-(7 ** 99999)) == f"{-Decimal(7) ** 99999:.27e}".replace("E", "e")
+    context = decimal.Context(prec=28)
+    fraction = Fraction(10 ** 6000 + 1, 3 ** 7000)
+    assert number_to_text(fraction) == f"{context.divide(Decimal(fraction.numerator), Decimal(fraction.denominator)):.27e}"
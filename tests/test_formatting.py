@@ -0,0 +1,40 @@
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+from formatting import ENGINEERING, SCIENTIFIC, NumberFormat, format_input, format_number
+
+
+def test_general_notation():
+    assert format_number(5.000000000000001) == "5"
+    assert format_number(0.1 + 0.2) == "0.3"
+    assert format_number(1234567.0, grouping=True) == "1,234,567"
+    assert format_number(Fraction(1, 3)) == "1/3"
+    assert format_number(Decimal("1.50")) == "1.50"
+
+
+def test_fixed_notations():
+    assert format_number(12345.0, 3, SCIENTIFIC) == "1.23e+04"
+    assert format_number(12345.0, 3, ENGINEERING) == "12.3e+03"
+    assert format_number(Fraction(1, 3), 4, SCIENTIFIC) == "3.333e-01"
+    assert format_number(3 * 10 ** 5000, 3, SCIENTIFIC) == "3e+5000"
+
+
+def test_signed_zero_is_not_cached_away():
+    assert format_number(0.0) == "0"
+    assert format_number(-0.0) == "-0"
+    assert format_number(0.0) == "0"
+
+
+def test_input_being_typed_keeps_its_digits():
+    assert format_input("1.50") == "1.50"
+    assert format_input("1234.5", grouping=True) == "1,234.5"
+    assert format_input("0.30000000000000004") == "0.3"
+
+
+def test_number_format_bounds():
+    with pytest.raises(ValueError):
+        NumberFormat(digits=0)
+    with pytest.raises(ValueError):
+        NumberFormat(notation="roman")
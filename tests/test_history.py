@@ -0,0 +1,68 @@
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+from history import HistoryStore, approximate
+
+
+def test_wraparound_keeps_the_newest_entries():
+    store = HistoryStore(3)
+    evicted = [store.append(f"{i} + 0", float(i)) for i in range(5)]
+    assert evicted == [False, False, False, True, True]
+    assert len(store) == 3
+    assert [tuple(entry) for entry in store] == [("2 + 0", 2.0), ("3 + 0", 3.0), ("4 + 0", 4.0)]
+    assert store[-1].result == 4.0
+    assert store.total_appended == 5
+    assert store.first_sequence() == 2
+
+
+def test_index_out_of_range():
+    store = HistoryStore(2)
+    store.append("1", 1.0)
+    with pytest.raises(IndexError):
+        store[1]
+    with pytest.raises(IndexError):
+        store[-2]
+
+
+def test_exact_results_are_kept_exactly():
+    store = HistoryStore(2)
+    store.append("1 ÷ 3", Fraction(1, 3))
+    store.append("0.1 + 0.2", Decimal("0.3"))
+    store.append("2^2000", 2 ** 2000)
+    assert store[0].result == Decimal("0.3")
+    assert store[1].result == 2 ** 2000
+    assert store.approximate_result(1) == float("inf")
+    # The evicted Fraction's side-table entry went with it
+    assert len(store._exact) == 2
+
+
+def test_results_column_in_order_after_wrapping():
+    store = HistoryStore(4)
+    for i in range(6):
+        store.append(str(i), float(i))
+    assert list(store.results_column()) == [2.0, 3.0, 4.0, 5.0]
+    assert [entry.result for entry in store.latest(2)] == [5.0, 4.0]
+
+
+def test_clear_keeps_sequence_numbers():
+    store = HistoryStore(4)
+    for i in range(3):
+        store.append(str(i), float(i))
+    store.clear()
+    assert len(store) == 0
+    assert store.first_sequence() == 3
+    store.append("x", 1.0)
+    assert store[0].expression == "x"
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        HistoryStore(0)
+
+
+def test_approximate():
+    assert approximate(Fraction(1, 4)) == 0.25
+    assert approximate(10 ** 400) == float("inf")
+    assert approximate(-10 ** 400) == float("-inf")
@@ -0,0 +1,76 @@
+import re
+
+from engine import number_to_text
+from history import HistoryStore
+from history_index import HistoryIndex
+
+
+def build(count, capacity=None):
+    store = HistoryStore(capacity or count)
+    for i in range(count):
+        store.append(f"{i} × 3", float(i * 3))
+    return store, HistoryIndex(store)
+
+
+def expressions(store, sequences):
+    first = store.first_sequence()
+    return [store[sequence - first].expression for sequence in sequences]
+
+
+def scan(store, words, low=float("-inf"), high=float("inf")):
+    # Reference answer: every word prefixes a word of the entry, newest first
+    matches = []
+    for expression, result in reversed(list(store)):
+        entry_words = re.findall(r"[0-9A-Za-z_.]+", f"{expression} {number_to_text(result)}".lower())
+        if low <= result <= high and all(any(word.startswith(query) for word in entry_words)
+                                          for query in words):
+            matches.append(expression)
+    return matches
+
+
+def test_word_prefixes_match_a_scan():
+    store, index = build(3000)
+    for query in ("19", "12 36", "1 2 3", "12345", "1234 3702", "29 .0", "2999"):
+        assert expressions(store, index.search(query)) == scan(store, query.split())[:1000], query
+
+
+def test_value_ranges_and_comparisons():
+    store, index = build(100)
+    assert expressions(store, index.search("100..110")) == ["36 × 3", "35 × 3", "34 × 3"]
+    assert expressions(store, index.search(">291")) == ["99 × 3", "98 × 3"]
+    assert expressions(store, index.search("<=3")) == ["1 × 3", "0 × 3"]
+    assert expressions(store, index.search("=150")) == ["50 × 3"]
+    assert expressions(store, index.search("8 >200")) == scan(store, ["8"], low=200.5)
+    assert expressions(store, index.search("8 >200")) == ["89 × 3", "88 × 3", "87 × 3", "86 × 3",
+                                                          "85 × 3", "84 × 3", "83 × 3", "82 × 3",
+                                                          "81 × 3", "80 × 3"]
+
+
+def test_limit():
+    store, index = build(5000)
+    assert len(index.search("1", limit=10)) == 10
+
+
+def test_sync_follows_appends_and_evictions():
+    store, index = build(10, capacity=10)
+    for i in range(10, 25):
+        store.append(f"{i} × 3", float(i * 3))
+    assert expressions(store, index.search("1")) == scan(store, ["1"])
+    assert index.search("3..10") == []
+
+
+def test_sync_in_slices():
+    store = HistoryStore(100)
+    index = HistoryIndex(store)
+    for i in range(50):
+        store.append(str(i), float(i))
+    assert not index.sync(20)
+    assert index.next_sequence == 20
+    assert index.sync(40)
+    assert expressions(store, index.search("49")) == ["49"]
+
+
+def test_queries_without_criteria():
+    store, index = build(10)
+    assert index.search("") == []
+    assert index.search("×") == []
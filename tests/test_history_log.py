@@ -0,0 +1,83 @@
+import math
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+from history_log import HistoryLog, decode_result, encode_entry
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = HistoryLog(str(tmp_path / "history.log"))
+    yield log
+    log.close()
+
+
+def test_round_trip(log):
+    entries = [("1 + 1", 2.0), ("0.1 + 0.2", 0.30000000000000004), ("1 ÷ 3", Fraction(1, 3)),
+               ("2^100", 2 ** 100), ("0.1 + 0.2", Decimal("0.3")), ("1 ÷ 0", math.inf)]
+    for expression, result in entries[:3]:
+        log.append(expression, result)
+    log.append_many(entries[3:])
+    reloaded = HistoryLog(log.path).read_tail(10)
+    assert reloaded == entries
+    assert type(reloaded[4][1]) is Decimal
+
+
+def test_appends_reach_the_file_before_a_sync(log):
+    log.append("1 + 1", 2.0)
+    assert log.pending() == 1
+    with open(log.path, "rb") as f:
+        assert f.read() == b"1 + 1\t2.0\n"
+    log.sync()
+    assert log.pending() == 0
+
+
+def test_read_tail_returns_only_the_newest(log):
+    log.append_many([(str(i), float(i)) for i in range(100)])
+    assert [expression for expression, _ in log.read_tail(3)] == ["97", "98", "99"]
+    assert log.read_tail(0) == []
+
+
+def test_torn_lines_are_skipped(log):
+    log.append("1 + 1", 2.0)
+    log.close()
+    with open(log.path, "ab") as f:
+        f.write(b"2 + 2\t4.")  # crash mid-line
+    assert HistoryLog(log.path).read_tail(10) == [("1 + 1", 2.0)]
+    # The next writer terminates the torn line so it stays separate
+    log.append("3 + 3", 6.0)
+    log.close()
+    assert HistoryLog(log.path).read_tail(10) == [("1 + 1", 2.0), ("2 + 2", 4.0), ("3 + 3", 6.0)]
+
+
+def test_undecodable_lines_are_skipped(log):
+    log.close()
+    with open(log.path, "wb") as f:
+        f.write(b"1 + 1\t2.0\nbroken\tnot a number\n\xff\xfe\t1\n3\t3.0\n")
+    assert HistoryLog(log.path).read_tail(10) == [("1 + 1", 2.0), ("3", 3.0)]
+
+
+def test_missing_file_reads_empty(tmp_path):
+    assert HistoryLog(str(tmp_path / "missing.log")).read_tail(5) == []
+
+
+def test_compact_keeps_the_newest(log):
+    log.append_many([(str(i), float(i)) for i in range(10)])
+    assert log.compact(4) == 4
+    log.append("10", 10.0)
+    assert [expression for expression, _ in log.read_tail(100)] == ["6", "7", "8", "9", "10"]
+
+
+def test_tabs_and_newlines_in_expressions(log):
+    assert encode_entry("a\tb\nc", 1.0) == b"a b c\t1.0\n"
+
+
+def test_huge_exact_results_decode_as_decimals():
+    text = encode_entry("10^5000", 10 ** 5000).split(b"\t")[1].decode().strip()
+    value = decode_result(text)
+    assert type(value) is Decimal and value == Decimal("1e5000")
+    assert decode_result("inf") == math.inf
+    assert math.isnan(decode_result("nan"))
+    assert decode_result("0.1") == 0.1
@@ -0,0 +1,59 @@
+import math
+import random
+import statistics
+
+import pytest
+
+from streaming_stats import EXACT_VALUES, P2Quantile, StreamingStats
+
+
+def test_small_samples_are_exact():
+    stats = StreamingStats()
+    stats.extend(range(1, 8))
+    summary = stats.summary()
+    assert summary["count"] == 7
+    assert summary["mean"] == 4
+    assert summary["variance"] == 4
+    assert summary["sample_std"] == pytest.approx(statistics.stdev(range(1, 8)))
+    assert (summary["p25"], summary["p50"], summary["p75"]) == (2.5, 4, 5.5)
+    assert (summary["min"], summary["max"], summary["sum"]) == (1, 7, 28)
+
+
+def test_invalid_values_are_counted_and_ignored():
+    stats = StreamingStats()
+    stats.extend([1, math.nan, math.inf, 10 ** 400, 3])
+    summary = stats.summary()
+    assert summary["count"] == 2 and summary["invalid"] == 3
+    assert summary["mean"] == 2
+
+
+def test_empty_summary():
+    assert StreamingStats().summary() == {"count": 0, "invalid": 0}
+    assert math.isnan(P2Quantile(0.5).value())
+
+
+def test_large_samples_are_estimated_closely():
+    generator = random.Random(7)
+    values = [generator.gauss(0, 1) for _ in range(50000)]
+    stats = StreamingStats((0.1, 0.5, 0.9))
+    stats.extend(values)
+    cuts = statistics.quantiles(values, n=10, method="inclusive")
+    for quantile, expected in zip(stats.quantiles, (cuts[0], cuts[4], cuts[8])):
+        assert quantile.value() == pytest.approx(expected, abs=0.02)
+    assert stats.mean == pytest.approx(statistics.fmean(values))
+    assert stats.variance() == pytest.approx(statistics.pvariance(values))
+
+
+def test_markers_take_over_past_the_exact_buffer():
+    quantile = P2Quantile(0.5)
+    for value in range(EXACT_VALUES + 1):
+        quantile.add(value)
+    assert quantile.buffer is None
+    assert quantile.value() == EXACT_VALUES / 2
+    quantile.add(-1)
+    assert len(quantile.heights) == 5
+
+
+def test_quantile_bounds():
+    with pytest.raises(ValueError):
+        P2Quantile(1)
@@ -0,0 +1,182 @@
+from functools import lru_cache
+
+THEMES = {
+    "dark": {
+        "window": "#121212",
+        "text": "white",
+        "menu": "#1E1E1E",
+        "selected": "#333333",
+        "border": "#333",
+    },
+    "light": {
+        "window": "#F5F5F5",
+        "text": "black",
+        "menu": "#E0E0E0",
+        "selected": "#CCCCCC",
+        "border": "#999",
+    },
+    "blue": {
+        "window": "#0A192F",
+        "text": "#CCD6F6",
+        "menu": "#112240",
+        "selected": "#233554",
+        "border": "#233554",
+    },
+}
+
+# background, text, hover background
+BUTTON_COLORS = {
+    "number": ("#505050", "white", "#606060"),
+    "operator": ("#FF9500", "white", "#FFAA33"),
+    "function": ("#D4D4D2", "black", "#E4E4E2"),
+    "scientific": ("#3A3A3A", "white", "#4A4A4A"),
+}
+
+FUNCTION_KEYS = frozenset(['C', '±', '%', '⌫'])
+OPERATOR_KEYS = frozenset(['÷', '×', '-', '+', '='])
+SCIENTIFIC_KEYS = frozenset(['√', 'x²', 'xⁿ', '1/x', 'Σ', 'HEX', 'BIN', 'OCT', 'UNIT'])
+
+
+def button_type(text):
+    if text in FUNCTION_KEYS:
+        return "function"
+    elif text in OPERATOR_KEYS:
+        return "operator"
+    elif text in SCIENTIFIC_KEYS:
+        return "scientific"
+    return "number"
+
+
+def _widget_rules():
+    rules = ["""
+        QFrame#historyContainer {
+            background-color: rgba(30, 30, 30, 150);
+            border-radius: 10px;
+        }
+        QListView#historyView {
+            border: none;
+            background: transparent;
+            color: white;
+            padding: 5px;
+        }
+        QLineEdit#historySearch {
+            background-color: rgba(255, 255, 255, 20);
+            color: white;
+            border: none;
+            border-radius: 5px;
+            padding: 3px 6px;
+        }
+        QPushButton#historyToggle {
+            background-color: rgba(60, 60, 60, 150);
+            color: white;
+            border: none;
+            border-radius: 5px;
+            padding: 5px;
+        }
+        QPushButton#historyToggle:hover {
+            background-color: rgba(80, 80, 80, 150);
+        }
+        QTabBar#sessionTabs::tab {
+            background-color: rgba(60, 60, 60, 150);
+            color: white;
+            border-radius: 5px;
+            padding: 4px 10px;
+            margin-right: 4px;
+        }
+        QTabBar#sessionTabs::tab:selected {
+            background-color: #FF9500;
+        }
+        QFrame#displayFrame {
+            background-color: rgba(40, 40, 40, 150);
+            border-radius: 15px;
+        }
+        QLabel#expressionLabel {
+            color: rgba(200, 200, 200, 180);
+        }
+        QLabel#displayLabel {
+            color: white;
+        }
+        QLabel#displayLabel[busy="true"] {
+            color: rgba(255, 255, 255, 120);
+        }
+        QProgressBar#pasteProgress {
+            border: none;
+            border-radius: 3px;
+            background-color: rgba(255, 255, 255, 30);
+        }
+        QProgressBar#pasteProgress::chunk {
+            border-radius: 3px;
+            background-color: #FF9500;
+        }
+        QLabel#perfOverlay {
+            background-color: rgba(0, 0, 0, 180);
+            color: #7CFC00;
+            border-radius: 5px;
+            padding: 6px;
+        }
+        QPushButton[buttonType] {
+            border: none;
+            border-radius: 30px;
+            font-weight: bold;
+        }
+    """]
+    for kind, (background, text, hover) in BUTTON_COLORS.items():
+        rules.append(f"""
+        QPushButton[buttonType="{kind}"] {{
+            background-color: {background};
+            color: {text};
+        }}
+        QPushButton[buttonType="{kind}"]:hover {{
+            background-color: {hover};
+        }}
+    """)
+    # Mode keys (Σ) stay highlighted while their mode is on
+    rules.append("""
+        QPushButton[buttonType]:checked {
+            background-color: #FF9500;
+            color: white;
+        }
+    """)
+    return "".join(rules)
+
+
+WIDGET_RULES = _widget_rules()
+
+
+def _window_rules(window, text, menu, selected, border):
+    return f"""
+        QMainWindow {{
+            background-color: {window};
+        }}
+        QLabel {{
+            color: {text};
+        }}
+        QMenuBar {{
+            background-color: {menu};
+            color: {text};
+        }}
+        QMenuBar::item:selected {{
+            background-color: {selected};
+        }}
+        QMenu {{
+            background-color: {menu};
+            color: {text};
+            border: 1px solid {border};
+        }}
+        QMenu::item:selected {{
+            background-color: {selected};
+        }}
+    """ + WIDGET_RULES
+
+
+@lru_cache(maxsize=8)
+def theme_stylesheet(theme_name):
+    return _window_rules(**THEMES[theme_name])
+
+
+@lru_cache(maxsize=32)
+def custom_stylesheet(r, g, b):
+    text = 'white' if (r + g + b) < 384 else 'black'
+    menu = f"rgb({int(r * 0.8)}, {int(g * 0.8)}, {int(b * 0.8)})"
+    selected = f"rgb({int(r * 0.6)}, {int(g * 0.6)}, {int(b * 0.6)})"
+    return _window_rules(f"rgb({r}, {g}, {b})", text, menu, selected, selected)
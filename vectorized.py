@@ -0,0 +1,144 @@
+import math
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from engine import CalculationError, default_engine
+from expression import compile_expression, ExpressionError
+from history import approximate
+
+
+class NumpyOps:
+    # Drop-in for CalculatorEngine when the compiled closures run over whole
+    # arrays. Invalid elements (negative square roots, 0/0) become NaN
+    # instead of raising, matching the per-element fallback below.
+    def number(self, text):
+        return float(text)
+
+    def binary(self, op, a, b):
+        if op == '+':
+            return np.add(a, b)
+        elif op == '-':
+            return np.subtract(a, b)
+        elif op == '×':
+            return np.multiply(a, b)
+        elif op == '÷':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(np.equal(b, 0), np.nan, np.divide(a, b))
+        raise CalculationError(f"Unknown operator: {op!r}")
+
+    def square_root(self, value):
+        with np.errstate(invalid='ignore'):
+            return np.sqrt(value)
+
+    def power(self, base, exponent):
+        with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+            return np.power(np.asarray(base, dtype=float), exponent)
+
+    def reciprocal(self, value):
+        return self.binary('÷', 1.0, value)
+
+    def percent(self, value):
+        return np.divide(value, 100)
+
+
+NUMPY_OPS = NumpyOps() if np is not None else None
+
+NUMERIC_TYPECODES = frozenset('bBhHiIlLqQfd')
+
+
+def as_array(values):
+    if isinstance(values, range):
+        return np.arange(values.start, values.stop, values.step, dtype=float)
+    if isinstance(values, array) and values.typecode in NUMERIC_TYPECODES:
+        return np.frombuffer(values, dtype=values.typecode).astype(float)
+    return np.asarray(values, dtype=float)
+
+
+def value_range(start, stop, step=1):
+    # Like range() but accepts floats; integral bounds stay a real range
+    if step == 0:
+        raise ValueError("Step must not be zero")
+    if all(float(bound).is_integer() for bound in (start, stop, step)):
+        return range(int(start), int(stop), int(step))
+    if np is not None:
+        return np.arange(start, stop, step, dtype=float)
+    count = max(0, math.ceil((stop - start) / step))
+    return [start + i * step for i in range(count)]
+
+
+def evaluate_vector(expression, values, variable="x", engine=None):
+    # Evaluates `expression` once for every element of `values` bound to
+    # `variable`. Float arithmetic runs as a single NumPy pass when NumPy is
+    # installed; otherwise, or for an exact-mode engine, each element goes
+    # through the engine and the results come back as an array('d') (or a
+    # list for exact modes).
+    try:
+        compiled = compile_expression(expression)
+    except ExpressionError as exc:
+        raise CalculationError(str(exc)) from None
+    unknown = compiled.variables - {variable}
+    if unknown:
+        raise CalculationError(f"Unknown variable: {sorted(unknown)[0]!r}")
+
+    engine = engine or default_engine
+    if np is not None and not engine.exact:
+        data = as_array(values)
+        try:
+            result = compiled.root(NUMPY_OPS, {variable: data})
+        except ExpressionError as exc:
+            raise CalculationError(str(exc)) from None
+        if np.ndim(result) == 0:
+            result = np.full(data.shape, float(result))
+        return result
+
+    root = compiled.root
+    env = {}
+    results = [] if engine.exact else array('d')
+    append = results.append
+    nan = float('nan')
+    for value in values:
+        env[variable] = engine.coerce(value) if engine.exact else float(value)
+        try:
+            append(root(engine, env))
+        except CalculationError:
+            append(nan)
+    return results
+
+
+def summarize(values):
+    if np is not None and isinstance(values, np.ndarray):
+        finite = values[np.isfinite(values)]
+        summary = {"count": int(values.size), "invalid": int(values.size - finite.size)}
+        if finite.size:
+            summary.update(sum=float(finite.sum()), mean=float(finite.mean()),
+                           std=float(finite.std()), min=float(finite.min()),
+                           max=float(finite.max()))
+        return summary
+
+    # Single pass (Welford) so generators and huge inputs work too; exact
+    # results too big for a float count as infinite, hence invalid
+    count = invalid = 0
+    total = mean = m2 = 0.0
+    low = high = None
+    for value in values:
+        count += 1
+        value = approximate(value)
+        if not math.isfinite(value):
+            invalid += 1
+            continue
+        n = count - invalid
+        total += value
+        delta = value - mean
+        mean += delta / n
+        m2 += delta * (value - mean)
+        low = value if low is None or value < low else low
+        high = value if high is None or value > high else high
+    summary = {"count": count, "invalid": invalid}
+    n = count - invalid
+    if n:
+        summary.update(sum=total, mean=mean, std=math.sqrt(m2 / n), min=low, max=high)
+    return summary
@@ -0,0 +1,124 @@
+import itertools
+import multiprocessing
+import threading
+
+from PyQt6.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+from engine import serve_jobs
+
+DEFAULT_TIMEOUT_MS = 10000
+
+
+class CalculationWorker(QObject):
+    # Runs engine operations in a helper process. A big-integer or
+    # high-precision Decimal operation holds the GIL for its whole duration,
+    # so a thread would still freeze the window; a process can also be
+    # killed outright, which is how cancel() and the timeout stop a runaway
+    # job. The process is started on first use and again after a cancel.
+    # Results arrive on a reader thread and reach the GUI thread through a
+    # queued signal.
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+    busy_changed = pyqtSignal(bool)
+    _received = pyqtSignal(int, object, object)
+
+    def __init__(self, timeout_ms=DEFAULT_TIMEOUT_MS, parent=None):
+        super().__init__(parent)
+        self.timeout_ms = timeout_ms
+        self.process = None
+        self.connection = None
+        self.job_ids = itertools.count(1)
+        self.pending = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.on_timeout)
+        self._received.connect(self.on_received, Qt.ConnectionType.QueuedConnection)
+
+    def is_busy(self):
+        return self.pending is not None
+
+    def submit(self, engine, operation, *args):
+        # Returns the job id that finished/failed will carry. Only one job
+        # runs at a time; submitting while busy cancels the previous job.
+        if self.pending is not None:
+            self.cancel()
+        self.ensure_process()
+        job_id = next(self.job_ids)
+        self.connection.send((job_id, engine.mode, engine.precision, operation, args))
+        self.pending = job_id
+        if self.timeout_ms:
+            self.timer.start(self.timeout_ms)
+        self.busy_changed.emit(True)
+        return job_id
+
+    def ensure_process(self):
+        if self.process is not None and self.process.is_alive():
+            return
+        context = multiprocessing.get_context("spawn")
+        parent_end, child_end = context.Pipe()
+        self.process = context.Process(target=serve_jobs, args=(child_end,), daemon=True)
+        self.process.start()
+        child_end.close()
+        self.connection = parent_end
+        threading.Thread(target=self.read_results, args=(parent_end,), daemon=True).start()
+
+    def read_results(self, connection):
+        while True:
+            try:
+                job_id, result, error = connection.recv()
+            except (EOFError, OSError):
+                # Job id -1 reports that this connection's process is gone
+                self._received.emit(-1, connection, None)
+                return
+            self._received.emit(job_id, result, error)
+
+    def on_received(self, job_id, result, error):
+        if job_id == -1:
+            # Only an unexpected exit of the current process is a failure;
+            # cancel() already cleaned up after the ones it terminated
+            if result is self.connection and self.pending is not None:
+                job_id = self.pending
+                self.stop_process()
+                self.failed.emit(job_id, "Calculation worker stopped")
+            return
+        # Results of cancelled or timed-out jobs are dropped
+        if job_id != self.pending:
+            return
+        self.timer.stop()
+        self.pending = None
+        self.busy_changed.emit(False)
+        if error is None:
+            self.finished.emit(job_id, result)
+        else:
+            self.failed.emit(job_id, error)
+
+    def on_timeout(self):
+        job_id = self.pending
+        self.stop_process()
+        self.failed.emit(job_id, "Calculation timed out")
+
+    def cancel(self):
+        if self.pending is not None:
+            self.stop_process()
+
+    def stop_process(self):
+        self.timer.stop()
+        self.pending = None
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join(1)
+            self.connection.close()
+            self.process = None
+            self.connection = None
+        self.busy_changed.emit(False)
+
+    def shutdown(self):
+        self.pending = None
+        self.timer.stop()
+        if self.process is not None:
+            self.connection.close()
+            self.process.join(1)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+            self.connection = None